@@ -2,7 +2,8 @@
 This file is used to render the page for Group chat view
 """
 import os
-from app_utils import render_group_agents_view, set_page_config
+from app_utils import render_group_agents_view, set_page_config, load_config_registry, \
+                      cancel_pending_response
 
 def render(config_file:str, dir_name:str):
     """
@@ -13,7 +14,10 @@ def render(config_file:str, dir_name:str):
         dir_name: The directory name
     """
     set_page_config()
-    render_group_agents_view(config_file, dir_name)
+    # The chat page is not shown so its response would not be read
+    cancel_pending_response()
+    config_registry = load_config_registry(config_file, dir_name)
+    render_group_agents_view(config_registry)
 
 
 
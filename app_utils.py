@@ -1,6 +1,7 @@
 """
 This module has the necesary utils to deal with App Interface and intereactions
 """
+import math
 import os
 from datetime import datetime
 from typing import Dict, Callable, List, Literal, Optional
@@ -8,10 +9,10 @@ from uuid import uuid4
 from shutil import make_archive
 import streamlit_nested_layout
 import streamlit as st
-from backend.backend import get_models, Conversation,\
-                    ModelMetaInfo, start_conversation, \
-                    summmarize_conversation, get_handler, \
-                    get_group_agents
+from backend.backend import ConfigRegistry, Conversation,\
+                    ModelMetaInfo, start_conversation, start_response
+from backend.summarizer import Summarizer
+from conversations.conversation_registry import ConversationRegistry
 from ui_elements.format_option import FormatOption
 from ui_elements.components import render_user_message, render_system_message, \
                                     render_group_ai_message, render_group_user_message
@@ -20,58 +21,88 @@ from schema.message import Message
 from schema.group_message import GroupMessage
 from schema.attachment_message import AttachmentMessage
 from schema.group_agent import GroupAgent
+from utils.cancellation import CANCELLATION_STATS
 
+# The number of recent messages rendered, "Load earlier messages" renders as many more
+HISTORY_PAGE_SIZE = 20
+# The number of conversations listed in a page of the sidebar
+CONVERSATION_PAGE_SIZE = 20
 
 
 
-def load_models(config_file:str, base_path:str)->Dict[str, ModelMetaInfo]:
+def load_config_registry(config_file:str, base_path:str)->ConfigRegistry:
     """
-    This function loads the models from the config file
-    If the models are already loaded, it returns the models from the session state
+    This function loads the config registry of the session
+    The config file is parsed and validated once and the registry is kept in the session state
     
     Args:
         config_file: The path to the config file
         base_path: The base path of the app
+    Returns:
+        The config registry of the session
+    """
+    if 'config_registry' not in st.session_state:
+        st.session_state['config_registry'] = ConfigRegistry(config_file, base_path)
+    return st.session_state['config_registry']
+
+
+def load_models(config_registry:ConfigRegistry)->Dict[str, ModelMetaInfo]:
+    """
+    This function loads the models from the config registry
+    If the models are already loaded, it returns the models from the session state
+    
+    Args:
+        config_registry: The config registry of the session
     Returns:
        A dictionary of models with key as the model identifier and value as the model meta info object
     """
     if 'models' not in st.session_state:
-        models = get_models(config_file, base_path)
+        models = config_registry.get_models()
         st.session_state['models'] = models
     else:
         models = st.session_state['models']
     return models
 
-def load_group_agents(config_file:str, base_path:str)->Dict[str, GroupAgent]:
+def load_summarizer(config_registry:ConfigRegistry)->Summarizer:
     """
-    This function loads the group agents from the config file
+    This function loads the summarizer of the conversations of the session
+
+    Args:
+        config_registry: The config registry of the session
+    Returns:
+        The summarizer of the session
+    """
+    if 'summarizer' not in st.session_state:
+        st.session_state['summarizer'] = Summarizer(config_registry.get_summarizer_setting(),
+                                                    load_models(config_registry))
+    return st.session_state['summarizer']
+
+def load_group_agents(config_registry:ConfigRegistry)->Dict[str, GroupAgent]:
+    """
+    This function loads the group agents from the config registry
     If the group agents are already loaded, it returns the group agents from the session state
 
     Args:
-        config_file: The path to the config file
-        base_path: The base path of the app
+        config_registry: The config registry of the session
     Returns:
          A dictionary of group agents with key as the group agent identifier and value as the group agent object
     """
     if "group_agents" not in st.session_state:
-        group_agents = get_group_agents(config_file, base_path)
+        group_agents = config_registry.get_group_agents()
         st.session_state["group_agents"] = group_agents
     return st.session_state["group_agents"]
 
-def load_conversations()->List[Conversation]:
+def load_conversation_registry()->ConversationRegistry:
     """
-    This function loads the conversations from the session state
-    If the conversations are not loaded, it initializes the conversations
+    This function loads the registry of the conversations from the session state
+    If the registry is not loaded, it initializes the registry
     
     Returns:
-        The list of conversations
+        The registry of the conversations
     """
-    if 'conversations' not in st.session_state:
-        st.session_state['conversations'] = []
-        conversations = []
-    else:
-        conversations = st.session_state['conversations']
-    return conversations
+    if 'conversation_registry' not in st.session_state:
+        st.session_state['conversation_registry'] = ConversationRegistry()
+    return st.session_state['conversation_registry']
 
 
 def set_current_conversation(conversation:Conversation)->None:
@@ -99,10 +130,22 @@ def get_current_conversation()->Conversation:
     return current_conversation
 
 
+def cancel_pending_response()->None:
+    """
+    This function stops the response which is generated in the background, if any
+    It is called when the user leaves the conversation of the response
+    """
+    pending_response = st.session_state.get('pending_response')
+    if pending_response is not None:
+        pending_response.cancel()
+        st.session_state['pending_response'] = None
+
+
 def reset_conversation()->None:
     """
     This function resets the screen to start a new conversation
     """
+    cancel_pending_response()
     st.session_state['current_conversation'] = None
 
 
@@ -117,54 +160,175 @@ def conversation_on_click(conversation:Conversation)->Callable[[], None]:
         The function callback that is called when the conversation is clicked
     """
     def conversation_clicked_inner():
+        if st.session_state['current_conversation'] is not conversation:
+            cancel_pending_response()
         st.session_state['current_conversation'] = conversation
     return conversation_clicked_inner
 
 
-def render_sidebar(current_conversation:Conversation, all_conversations:List[Conversation])->None:
+def get_history_window(conversation:Conversation)->int:
     """
-    This function renders the sidebar with the list of conversations
+    This function returns the number of most recent messages rendered for the conversation
+    
+    Args:
+        conversation: The conversation
+    
+    Returns:
+        The number of messages to render
+    """
+    history_windows = st.session_state.setdefault('history_windows', {})
+    return history_windows.get(conversation.conversation_id, HISTORY_PAGE_SIZE)
+
+
+def load_earlier_messages(conversation:Conversation)->Callable[[], None]:
+    """
+    This function returns a function that is called to render more messages of the conversation
+    
+    Args:
+        conversation: The conversation
+    
+    Returns:
+        The function callback that is called when earlier messages are requested
+    """
+    def load_earlier_messages_inner():
+        history_windows = st.session_state.setdefault('history_windows', {})
+        history_windows[conversation.conversation_id] = \
+            get_history_window(conversation) + HISTORY_PAGE_SIZE
+    return load_earlier_messages_inner
+
+
+def set_conversation_page(page:int)->None:
+    """
+    This function sets the page of the list of conversations in the sidebar
+    
+    Args:
+        page: The index of the page
+    """
+    st.session_state['conversation_page'] = page
+
+
+def render_sidebar(current_conversation:Conversation,
+                   conversation_registry:ConversationRegistry)->None:
+    """
+    This function renders the list of conversations, it is called inside the sidebar
+    The list is rendered in a fragment which is rerun on its own when it is used.
+    While a response is pending the list is rendered with the page instead, streamlit
+    does not stop the run of the page for a fragment rerun, so a click on the list would
+    only cancel the response once it is complete. The click then reruns the page,
+    which stops the stream and runs the callback which cancels the response.
     
     Args:
         current_conversation: The current conversation
-        all_conversations: The list of all conversations
+        conversation_registry: The registry of the conversations of the session
     """
-    with st.sidebar:
-        st.button("🧵 Start a new conversation", use_container_width=True,
-                  on_click=reset_conversation)
-        for i, conversation in enumerate(all_conversations):
-            if not conversation.is_summarized:
-                continue
-            button_type = "primary" if conversation == current_conversation else "secondary"
-            st.button(conversation.conversation_topic , use_container_width=True,
-                      key=f"conversation_{i}",
-                    type=button_type,
-                    on_click=conversation_on_click(conversation))
+    if st.session_state.get('pending_response') is not None:
+        render_conversation_list(current_conversation, conversation_registry)
+    else:
+        render_conversation_list_fragment(current_conversation, conversation_registry)
+
+
+def render_conversation_list(current_conversation:Conversation,
+                             conversation_registry:ConversationRegistry)->None:
+    """
+    This function renders the list of conversations
+    The conversations are filtered by the search box and listed from the most recent,
+    one page at a time. In the fragment the whole page is rerun only if the clicked
+    conversation is not the current conversation
+    
+    Args:
+        current_conversation: The current conversation
+        conversation_registry: The registry of the conversations of the session
+    """
+    if get_current_conversation() is not current_conversation:
+        # The model selection and the chat pane show the current conversation
+        st.rerun(scope="app")
+    st.button("🧵 Start a new conversation", use_container_width=True,
+              on_click=reset_conversation)
+    query = st.text_input("🔎 Search conversations", key="conversation_search",
+                          on_change=set_conversation_page, args=(0,))
+    conversations = []
+    for conversation in reversed(conversation_registry.search(query)):
+        conversation.update_topic()
+        if conversation.is_summarized or conversation.summary_future is not None:
+            conversations.append(conversation)
+    if query and not conversations:
+        st.caption("No conversation matches the search")
+    page_count = max(1, math.ceil(len(conversations) / CONVERSATION_PAGE_SIZE))
+    page = min(st.session_state.get('conversation_page', 0), page_count - 1)
+    start = page * CONVERSATION_PAGE_SIZE
+    for conversation in conversations[start:start + CONVERSATION_PAGE_SIZE]:
+        button_type = "primary" if conversation == current_conversation else "secondary"
+        st.button(conversation.conversation_topic , use_container_width=True,
+                  key=f"conversation_{conversation.conversation_id}",
+                type=button_type,
+                on_click=conversation_on_click(conversation))
+    if page_count > 1:
+        previous_col, page_col, next_col = st.columns([1, 2, 1])
+        with previous_col:
+            st.button("◀️", key="previous_conversation_page", disabled=page == 0,
+                      on_click=set_conversation_page, args=(page - 1,))
+        with page_col:
+            st.caption(f"Page {page + 1} of {page_count}")
+        with next_col:
+            st.button("▶️", key="next_conversation_page", disabled=page == page_count - 1,
+                      on_click=set_conversation_page, args=(page + 1,))
+    if CANCELLATION_STATS.cancelled_responses:
+        st.caption(f"✂️ {CANCELLATION_STATS.cancelled_responses} responses cancelled,"
+                   f" about {CANCELLATION_STATS.tokens_saved} tokens saved")
+
+
+render_conversation_list_fragment = st.fragment(render_conversation_list)
+
+
+@st.fragment
+def render_required_fields(model_used_by_user:ModelMetaInfo)->None:
+    """
+    This function renders the required fields of the model, it is called inside the sidebar
+    The fields are rerun on their own when they are edited, their values are read
+    from the session state when the conversation is started
+    
+    Args:
+        model_used_by_user: The model used by the user
+    """
+    model_used_by_user.render_required_fields()
 
 
-def on_new_user_messaage(current_conversation:Conversation, model_used_by_user:ModelMetaInfo)->None:
+def on_new_user_messaage(current_conversation:Conversation, model_used_by_user:ModelMetaInfo,
+                         summarizer:Summarizer)->None:
     """
     This function is called when a new user message is submitted
-    A new conversation is created if the current conversation doesnt exist
+    A new conversation is created if the current conversation doesnt exist.
+    The response is generated in the background from here, before the page is rendered again,
+    and render_conversation displays it when it reaches the end of the conversation
     
     Args:
         current_conversation: The current conversation
         model_used_by_user: The model used by the user
+        summarizer: The summarizer of the conversations
     """
     prompt = st.session_state.chat_input
-    st.session_state['user_input'] = prompt
+    cancel_pending_response()
     if current_conversation is None:
         model_used_by_user.set_value_from_sidebar()
         conversation = start_conversation(prompt, model_used_by_user)
-        st.session_state['conversations'].append(conversation)
+        load_conversation_registry().add(conversation)
     else:
         conversation = current_conversation
     set_current_conversation(conversation)
+    st.session_state['pending_response'] = start_response(conversation, prompt,
+                                                          model_used_by_user.stream_arguments)
+    # The summary is requested after the response so a local model serves it first
+    if not conversation.is_summarized and conversation.summary_future is None:
+        summarizer.start_summarization(conversation, prompt)
 
 
+@st.fragment
 def render_conversation(current_conversation:Conversation, model_used_by_user:ModelMetaInfo)->None:
     """
-    This function renders the conversation
+    This function renders the conversation, loading earlier messages only reruns the conversation
+    Only the most recent messages are rendered, earlier messages are loaded on request.
+    The response which is generated in the background for the conversation
+    is streamed at the end of the conversation
     
     Args:
         current_conversation: The current conversation
@@ -176,47 +340,52 @@ def render_conversation(current_conversation:Conversation, model_used_by_user:Mo
         icon_path = model_used_by_user.icon
     else:
         icon_path = None
+    pending_response = st.session_state.get('pending_response')
+    if pending_response is not None and pending_response.conversation is not current_conversation:
+        pending_response = None
     messages = current_conversation.llm_model.get_messages()
+    if pending_response is not None:
+        # The turn is added to the messages when the response is complete
+        messages = messages[:pending_response.history_length]
+    start = max(0, len(messages) - get_history_window(current_conversation))
+    # Start at a user message so the response time of the first response can be shown
+    while start > 0 and messages[start].message_type != "USER":
+        start -= 1
+    if start > 0:
+        st.button(f"⬆️ Load earlier messages ({start} hidden)", use_container_width=True,
+                  on_click=load_earlier_messages(current_conversation))
     last_user_message = None
-    for message in messages:
+    for message in messages[start:]:
         if message.message_type == "USER":
             render_user_message(message)
             last_user_message = message
         else:
             render_system_message(message, last_user_message, icon_path=model_used_by_user.icon)
-    if 'user_input' not in st.session_state:
-        st.session_state['user_input'] = None
-    user_input = st.session_state['user_input']
-    if user_input:
-        user_message = Message(message=user_input, message_type='USER', timestamp=datetime.now())
+    if pending_response is not None:
+        user_message = pending_response.user_message
         render_user_message(user_message)
         system_message = Message(message="I am thinking...", message_type="AI")
-        system_container, placeholder = render_system_message(system_message, user_message,
-                                                              calculate_time=False,
-                                                              icon_path=icon_path)
-        with system_container:
-            with st.spinner(":hourglass_flowing_sand:"):
-                handler = get_handler(placeholder)
-                system_response = current_conversation.llm_model.get_prompt_response(
-                    user_message.message, handler)
-                system_message.message = system_response
-                system_message.timestamp = datetime.now()
-            render_system_message(system_message, user_message, placeholder, system_container,
-                                  icon_path=icon_path)
-        if not current_conversation.is_summarized:
-            with st.sidebar:
-                container = st.empty()
-                handler = get_handler(container)
-                with st.spinner("Summarizing conversation..."):
-                    sumarized_text = summmarize_conversation(current_conversation,
-                                                             user_input, handler)
-                container.empty()
-                del container
-                st.button(sumarized_text, use_container_width=True, type="primary",
-                          on_click=conversation_on_click(current_conversation))
-                current_conversation.conversation_topic = sumarized_text
-                current_conversation.is_summarized = True
-        st.session_state['user_input'] = None
+        system_container, placeholder = render_system_message(
+            system_message, user_message, calculate_time=False, icon_path=icon_path,
+            stream_key=pending_response.stream_key)
+        try:
+            with system_container:
+                with st.spinner(":hourglass_flowing_sand:"):
+                    system_response = pending_response.handler.stream(placeholder,
+                                                                      pending_response.future)
+                    system_message.message = system_response
+                    system_message.timestamp = datetime.now()
+                    system_message.metrics = pending_response.handler.metrics
+                render_system_message(system_message, user_message, placeholder,
+                                      system_container, icon_path=icon_path)
+        except Exception as error: # pylint: disable=broad-except
+            st.error(f"⚠️ The response could not be generated: {error}")
+        # Streamlit stops the script for a rerun with a BaseException which is not caught here,
+        # the response then stays pending and the next run streams the rest of it
+        st.session_state['pending_response'] = None
+        if current_conversation.update_topic():
+            # Show the summary in the sidebar which was rendered before it was ready
+            st.rerun(scope="app")
 
 
 
@@ -617,29 +786,97 @@ def reset_group_conversation()->None:
     st.session_state['view_mode'] = 'agents_view'
 
 
-def render_group_agents_view(config_file:str, base_path:str)->None:
+def render_group_agents_view(config_registry:ConfigRegistry)->None:
     """
     This function renders the group agents view
 
     Args:
-        config_file: The path to the config file
-        base_path: The base path
+        config_registry: The config registry of the session
     """
-    group_conversations = get_group_conversations()
     current_conversation = get_current_group_conversation()
     with st.sidebar:
-        st.button("🧵 Start a new conversation", use_container_width=True,
-                  on_click=reset_group_conversation)
-        for group_conversation in group_conversations:
-            st.button(group_conversation.conversation_topic, use_container_width=True,
-                        on_click=group_conversation_on_click,
-                        type="primary" if group_conversation == current_conversation else "secondary",
-                        args=(group_conversation,),
-                        key=group_conversation.conversation_topic)
-        
+        render_group_sidebar(current_conversation, get_group_view_mode())
+    render_group_main_view(config_registry, current_conversation)
+
+
+def is_group_chat_running(group_conversation:Optional[GroupConversation])->bool:
+    """
+    This function checks whether the agents of a group conversation are run on this page,
+    they are run when the conversation only has the message of the user
+
+    Args:
+        group_conversation: The group conversation object
+
+    Returns:
+        True if the group chat is run else False
+    """
+    return group_conversation is not None and len(group_conversation.get_messages()) == 1
+
+
+def render_group_sidebar(current_conversation:Optional[GroupConversation],
+                         view_mode:Literal['agents_view', 'character_view', 'chat_view'])->None:
+    """
+    This function renders the list of group conversations, it is called inside the sidebar
+    The list is rendered in a fragment which is rerun on its own when it is clicked.
+    While the group chat is run the list is rendered with the page instead, streamlit
+    does not stop the run of the page for a fragment rerun, so a click on the list
+    would only be handled once the group chat is complete.
+    
+    Args:
+        current_conversation: The current group conversation
+        view_mode: The group view mode
+    """
+    if is_group_chat_running(current_conversation):
+        render_group_conversation_list(current_conversation, view_mode)
+    else:
+        render_group_conversation_list_fragment(current_conversation, view_mode)
+
+
+def render_group_conversation_list(current_conversation:Optional[GroupConversation],
+                                   view_mode:Literal['agents_view', 'character_view',
+                                                     'chat_view'])->None:
+    """
+    This function renders the list of group conversations
+    In the fragment the whole page is rerun only if the click changed the view
+    
+    Args:
+        current_conversation: The current group conversation
+        view_mode: The group view mode
+    """
+    if get_current_group_conversation() is not current_conversation \
+        or get_group_view_mode() != view_mode:
+        st.rerun(scope="app")
+    st.button("🧵 Start a new conversation", use_container_width=True,
+              on_click=reset_group_conversation)
+    for group_conversation in get_group_conversations():
+        st.button(group_conversation.conversation_topic, use_container_width=True,
+                    on_click=group_conversation_on_click,
+                    type="primary" if group_conversation == current_conversation else "secondary",
+                    args=(group_conversation,),
+                    key=group_conversation.conversation_topic)
+
+
+render_group_conversation_list_fragment = st.fragment(render_group_conversation_list)
+
+
+@st.fragment
+def render_group_main_view(config_registry:ConfigRegistry,
+                           current_conversation:Optional[GroupConversation])->None:
+    """
+    This function renders the group agents, the characters and settings of a group agent
+    or the group conversation. Moving between the views only reruns the main view,
+    the whole page is rerun when a group conversation is started.
+    
+    Args:
+        config_registry: The config registry of the session
+        current_conversation: The current group conversation
+    """
+    if get_current_group_conversation() is not current_conversation:
+        # The list of group conversations shows the new conversation
+        st.rerun(scope="app")
     if get_group_view_mode() == 'agents_view':
         st.info("This is the page where you start a group conversation")
-        group_agents = load_group_agents(config_file, base_path)
+        group_agents = load_group_agents(config_registry)
         for group_agent_name, group_agent in group_agents.items():
             pic, meta_info, button_section = st.columns([2, 6, 2])
             with pic:
@@ -694,7 +931,7 @@ def render_group_agents_view(config_file:str, base_path:str)->None:
             group_conversation = get_current_group_conversation()
             if group_conversation is not None:
                 render_group_conversation(group_conversation)
-                if len(group_conversation.get_messages()) == 1:
+                if is_group_chat_running(group_conversation):
                     group_conversation.group_agent.run(group_conversation.conversation_topic)
                     artifact_basename = os.path.basename(group_conversation.final_artifact)
                     group_conversation.done = True
@@ -718,18 +955,21 @@ def get_session_id()->str:
 
 
 
-def render_models_view(config_file:str, base_path:str)->None:
+@st.fragment
+def render_models_view(config_registry:ConfigRegistry)->None:
     """
     This function renders the models view
+    The whole page is rerun when a model is put in focus
     
     Args:
-        config_file: The path to the config file
-        base_path: The base path
+        config_registry: The config registry of the session
     """
+    if state_of_model() != 'view':
+        st.rerun(scope="app")
     st.info("This is the page where you can edit or create a session model")
 
     session_tab, persistent_tab = st.tabs(["Session Models", "Persistent Model"])
-    models = load_models(config_file, base_path)
+    models = load_models(config_registry)
     persistent_models = {key: model for key, model in models.items() if model.is_persistent}
     session_models = {key: model for key, model in models.items() if not model.is_persistent}
 
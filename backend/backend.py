@@ -1,16 +1,88 @@
 """
 This file contains the backend logic for the streamlit app
 """
-import sys
-import os
-from importlib.util import spec_from_file_location, module_from_spec
-from typing import Dict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from uuid import uuid4
 from langchain import PromptTemplate
-from schema.config import pydantic_validate_config
+from schema.config import ConfigFile, get_validated_config
 from schema.group_agent import GroupAgent
+from schema.summarizer_setting import SummarizerSetting
 from models.meta_info import ModelMetaInfo
+from models.model_loader import load_model_class
+from models.base_model import BaseLLMModel
 from models.base_langchain_model import StreamlitDisplayHandler
 from conversations.conversation import Conversation
+from schema.message import Message
+from utils.async_runner import submit
+from utils.cancellation import CancellationToken
+
+
+class ConfigRegistry:
+    """
+    This class is used to serve the models, group agents and shared state
+    of a session from a single validated config file
+    """
+
+    def __init__(self, config_file:str, base_path:str) -> None:
+        """
+        This is the constructor for the ConfigRegistry class
+        
+        Args:
+            config_file: The path to the config file
+            base_path: The base path to the config file
+        """
+        self.config_file = config_file
+        self.base_path = base_path
+        self._config:ConfigFile = get_validated_config(config_file, base_path)
+        self._config.apply_shared_state()
+        self._models:Dict[str, ModelMetaInfo] = None
+        self._group_agents:Dict[str, GroupAgent] = None
+
+
+    def get_models(self)->Dict[str, ModelMetaInfo]:
+        """
+        This method is used to get the models of the session
+        
+        Returns:
+            The models with key as the model identifier
+        """
+        if self._models is None:
+            self._models = self._config.get_session_models()
+        return self._models
+
+
+    def get_group_agents(self)->Dict[str, GroupAgent]:
+        """
+        This method is used to get the group agents of the session
+        
+        Returns:
+            The group agents with key as the group agent identifier
+        """
+        if self._group_agents is None:
+            self._group_agents = self._config.get_session_group_agents()
+        return self._group_agents
+
+
+    def get_summarizer_setting(self)->SummarizerSetting:
+        """
+        This method is used to get the setting of the conversation summarizer
+        
+        Returns:
+            The summarizer setting
+        """
+        return self._config.summarizer_model
+
+
+    def get_shared_state(self)->Dict[str, Any]:
+        """
+        This method is used to get the shared state defined in the config file
+        
+        Returns:
+            The shared state
+        """
+        return dict(self._config.shared_state)
 
 
 def get_group_agents(config_file:str, base_path:str)->dict[str, GroupAgent]:
@@ -24,11 +96,7 @@ def get_group_agents(config_file:str, base_path:str)->dict[str, GroupAgent]:
     Returns:
         The group agents in the config file
     """
-    group_agents = pydantic_validate_config(config_file, base_path).group_chat_agents
-    group_agent_objects = {}
-    for group_agent_name, group_agent in group_agents.items():
-        group_agent_objects[group_agent_name] = group_agent
-    return group_agent_objects
+    return ConfigRegistry(config_file, base_path).get_group_agents()
 
 
 def get_models(config_file:str, base_path:str)->Dict[str, ModelMetaInfo]:
@@ -42,11 +110,25 @@ def get_models(config_file:str, base_path:str)->Dict[str, ModelMetaInfo]:
     Returns:
         The models in the config file
     """
-    models = pydantic_validate_config(config_file, base_path).models
-    model_objects = {}
-    for model_name, model_meta_info in models.items():
-        model_objects[model_name] = model_meta_info
-    return model_objects
+    return ConfigRegistry(config_file, base_path).get_models()
+
+
+def create_model(model_meta_info:ModelMetaInfo)->BaseLLMModel:
+    """
+    This method is used to create an instance of a model
+    
+    Args:
+        model_meta_info: The model meta information
+    
+    Returns:
+        The model object
+    """
+    model_class = load_model_class(model_meta_info.llm_model_file,
+                                   model_meta_info.llm_model_class)
+    system_message = model_meta_info.system_message
+    kvargs = model_meta_info.llm_arguments
+    memory_kvargs = model_meta_info.memory_arguments
+    return model_class(system_message=system_message, memory_kvargs=memory_kvargs, **kvargs)
 
 
 def start_conversation(conversation_topic:str, model_meta_info:ModelMetaInfo)->Conversation:
@@ -60,40 +142,23 @@ def start_conversation(conversation_topic:str, model_meta_info:ModelMetaInfo)->C
     Returns:
         The conversation object
     """
-    model_file_name = os.path.basename(model_meta_info.llm_model_file)
-    abs_module_file = model_meta_info.llm_model_file
-    model_class = model_meta_info.llm_model_class
-    module_name = model_file_name.split('.', 1)[0]
-    spec = spec_from_file_location(module_name, abs_module_file)
-    module = module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-    model_class = getattr(module, model_class)
-    system_message = model_meta_info.system_message
-    kvargs = model_meta_info.llm_arguments
-    memory_kvargs = model_meta_info.memory_arguments
-    model_object = model_class(system_message=system_message, memory_kvargs=memory_kvargs, **kvargs)
+    model_object = create_model(model_meta_info)
     new_conversation = Conversation(conversation_topic=conversation_topic,
                         key=model_meta_info.key,
                         llm_model=model_object)
-    model_meta_info.add_conversation(new_conversation)
     return new_conversation
 
 
 
-def summmarize_conversation(conversation: Conversation,
-                            content_to_summarize:str,
-                            handler:StreamlitDisplayHandler)->str:
+def get_summarization_prompt(content_to_summarize:str)->str:
     """
-    This method is used to summarize a conversation
+    This method is used to get the prompt to summarize a conversation
     
     Args:
-        conversation: The conversation object
         content_to_summarize: The content to summarize
-        handler: The streamlit display handler
     
     Returns:
-        The summary onf the conversation
+        The summarization prompt
     """
     message = ['Human: Summarize """Hello world""" to less than 5 words',
     'AI: Hello World',
@@ -104,19 +169,98 @@ def summmarize_conversation(conversation: Conversation,
         input_variables=["content"],
         template=flow
     )
+    return summarization_prompt.format(content=content_to_summarize)
 
-    return conversation.llm_model.get_prompt_response_without_memory(
-        summarization_prompt.format(content=content_to_summarize),
-        stream_handler=handler)
 
-
-def get_handler(container)->StreamlitDisplayHandler:
+def get_handler(container, stream_arguments:Optional[Dict[str, Any]]=None,
+                stream_key:Optional[str]=None)->StreamlitDisplayHandler:
     """
     This method is used to get the handler to deal with streaming data
     
     Args:
         container: The streamlit container
+        stream_arguments: The arguments for the handler from the model config
+        stream_key: The key of the delta stream mounted in the container
     Returns:
         The streamlit display handler
     """
-    return StreamlitDisplayHandler(container)
+    return StreamlitDisplayHandler(container, stream_key=stream_key, **(stream_arguments or {}))
+
+
+@dataclass
+class PendingResponse:
+    """
+    This class is used to store a response which is generated in the background
+    """
+    conversation: Conversation
+    user_message: Message
+    handler: StreamlitDisplayHandler
+    future: Future
+    history_length: int
+    cancellation_token: CancellationToken
+    stream_key: Optional[str] = None
+
+
+    def cancel(self)->None:
+        """
+        This method is used to stop the generation if it is not complete
+        The partial response is saved in the conversation
+        """
+        if not self.future.done():
+            self.cancellation_token.cancel()
+
+
+async def get_response(conversation:Conversation, user_message:Message, history_length:int,
+                       handler:StreamlitDisplayHandler,
+                       cancellation_token:CancellationToken)->str:
+    """
+    This method is used to get the response to the message of the user
+    The stored user message keeps the id and the time of the message which was rendered
+    while the response was pending, so its rendered time is found in the render cache
+    
+    Args:
+        conversation: The conversation object
+        user_message: The message of the user
+        history_length: The number of messages of the conversation before the message
+        handler: The streamlit display handler
+        cancellation_token: The token which stops the generation
+    
+    Returns:
+        The response
+    """
+    response = await conversation.llm_model.aget_prompt_response(user_message.message, handler,
+                                                                 cancellation_token)
+    messages = conversation.llm_model.get_messages()
+    if len(messages) > history_length and messages[history_length].message_type == "USER":
+        messages[history_length].message_id = user_message.message_id
+        messages[history_length].created_at = user_message.timestamp.timestamp()
+    return response
+
+
+def start_response(conversation:Conversation, prompt:str,
+                   stream_arguments:Optional[Dict[str, Any]]=None)->PendingResponse:
+    """
+    This method is used to start generating the response to a prompt in the background
+    The output is buffered until a container is attached to the handler
+    
+    Args:
+        conversation: The conversation object
+        prompt: The message of the user
+        stream_arguments: The arguments for the handler from the model config
+    
+    Returns:
+        The pending response
+    """
+    stream_key = None
+    if (stream_arguments or {}).get("render_mode") == "delta":
+        stream_key = f"stream_{uuid4().hex}"
+    handler = get_handler(None, stream_arguments, stream_key)
+    history_length = len(conversation.llm_model.get_messages())
+    cancellation_token = CancellationToken()
+    user_message = Message(message=prompt, message_type='USER')
+    future = submit(get_response(conversation, user_message, history_length, handler,
+                                 cancellation_token))
+    return PendingResponse(conversation=conversation,
+                           user_message=user_message,
+                           handler=handler, future=future, history_length=history_length,
+                           cancellation_token=cancellation_token, stream_key=stream_key)
@@ -44,7 +44,9 @@ def run_metagpt(setting:MetaGPTSetting, characters:list['GroupAgentCharacter'],
         options = {"name" : character.name, 
                    "callback_handler" : StreamlitCallbackHandler(character.icon,
                                                                  setting.investment,
-                                                                 cost_container)
+                                                                 cost_container,
+                                                                 setting.flush_interval_ms,
+                                                                 setting.flush_tokens)
                    }
         if mapping[role] == 'Engineer':
             options["use_code_review"] = setting.code_review
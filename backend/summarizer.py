@@ -0,0 +1,192 @@
+"""
+This module summarizes the conversations into short topics in the background
+"""
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from typing import Dict, Optional
+from backend.backend import create_model, get_summarization_prompt
+from conversations.conversation import Conversation
+from models.base_model import BaseLLMModel
+from models.meta_info import ModelMetaInfo
+from schema.summarizer_setting import EXTRACTIVE_SUMMARIZER, SummarizerSetting
+from utils.async_runner import submit
+from utils.util import get_heuristic_title
+
+
+class TitleCache:
+    """
+    This class is used to share the summaries of the conversations between the sessions
+    The summaries are keyed by a hash of the summarizer and the first message and
+    the least recently used summaries are evicted when the cache is full
+    """
+
+    def __init__(self, max_size:int=256) -> None:
+        """
+        This is the constructor for the TitleCache class
+
+        Args:
+            max_size: The maximum number of summaries in the cache
+        """
+        self.max_size = max_size
+        self._titles:OrderedDict[str, str] = OrderedDict()
+        self._lock = Lock()
+
+
+    @staticmethod
+    def get_key(summarizer_key:str, content:str)->str:
+        """
+        This method is used to get the key of the summary of a content
+
+        Args:
+            summarizer_key: The key of the model which summarizes the content
+            content: The content to summarize
+
+        Returns:
+            The key of the summary
+        """
+        return sha256(f"{summarizer_key}\n{content}".encode("utf-8")).hexdigest()
+
+
+    def set_max_size(self, max_size:int)->None:
+        """
+        This method is used to change the maximum number of summaries in the cache
+
+        Args:
+            max_size: The maximum number of summaries in the cache
+        """
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+
+    def get(self, key:str)->Optional[str]:
+        """
+        This method is used to get a summary from the cache
+
+        Args:
+            key: The key of the summary
+
+        Returns:
+            The summary or None if it is not cached
+        """
+        with self._lock:
+            title = self._titles.get(key)
+            if title is not None:
+                self._titles.move_to_end(key)
+            return title
+
+
+    def put(self, key:str, title:str)->None:
+        """
+        This method is used to add a summary to the cache
+
+        Args:
+            key: The key of the summary
+            title: The summary
+        """
+        with self._lock:
+            self._titles[key] = title
+            self._titles.move_to_end(key)
+            self._evict()
+
+
+    def _evict(self)->None:
+        """
+        This method is used to remove the least recently used summaries over the maximum size
+        """
+        while len(self._titles) > self.max_size:
+            self._titles.popitem(last=False)
+
+
+TITLE_CACHE = TitleCache()
+
+
+class Summarizer:
+    """
+    This class is used to summarize the conversations of a session with the model of the
+    summarizer setting, the summaries are limited to max_tokens tokens
+    """
+
+    def __init__(self, setting:SummarizerSetting, models:Dict[str, ModelMetaInfo]) -> None:
+        """
+        This is the constructor for the Summarizer class
+
+        Args:
+            setting: The summarizer setting
+            models: The models of the session
+        """
+        self.setting = setting
+        self.models = models
+        self._model:Optional[BaseLLMModel] = None
+        TITLE_CACHE.set_max_size(setting.cache_size)
+
+
+    def get_model(self, conversation:Conversation)->BaseLLMModel:
+        """
+        This method is used to get the model which summarizes the conversation
+        The model of the conversation is used if the summarizer model can not be created,
+        for example because its required arguments are not set in this session,
+        the summary then runs outside the evaluated context of the conversation,
+        see BaseLangChainModel.aget_prompt_response_without_memory
+
+        Args:
+            conversation: The conversation to summarize
+
+        Returns:
+            The model which summarizes the conversation
+        """
+        if self.setting.model is None:
+            return conversation.llm_model
+        if self._model is None:
+            try:
+                self._model = create_model(self.models[self.setting.model])
+            except ValueError:
+                return conversation.llm_model
+        return self._model
+
+
+    def start_summarization(self, conversation:Conversation, content_to_summarize:str)->None:
+        """
+        This method is used to summarize a conversation in the background
+        The topic is set to a title made from the first words of the content until
+        the summary is ready, see Conversation.update_topic
+
+        Args:
+            conversation: The conversation to summarize
+            content_to_summarize: The content to summarize
+        """
+        conversation.conversation_topic = get_heuristic_title(content_to_summarize)
+        if self.setting.model == EXTRACTIVE_SUMMARIZER:
+            conversation.is_summarized = True
+            return
+        cache_key = TITLE_CACHE.get_key(self.setting.model or conversation.key,
+                                        content_to_summarize)
+        title = TITLE_CACHE.get(cache_key)
+        if title is not None:
+            conversation.conversation_topic = title
+            conversation.is_summarized = True
+            return
+        conversation.summary_future = submit(self.asummarize(self.get_model(conversation),
+                                                             content_to_summarize, cache_key))
+
+
+    async def asummarize(self, model:BaseLLMModel, content_to_summarize:str,
+                         cache_key:str)->str:
+        """
+        This method is used to summarize a content and cache the summary
+
+        Args:
+            model: The model which summarizes the content
+            content_to_summarize: The content to summarize
+            cache_key: The key of the summary in the cache
+
+        Returns:
+            The summary
+        """
+        title = await model.aget_prompt_response_without_memory(
+            get_summarization_prompt(content_to_summarize), max_tokens=self.setting.max_tokens)
+        title = title.strip()
+        if title:
+            TITLE_CACHE.put(cache_key, title)
+        return title
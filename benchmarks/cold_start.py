@@ -0,0 +1,123 @@
+"""
+This script measures the cold start of the chat page with N configured models
+Each measure runs in a new interpreter, which imports the modules of the page, then loads
+the models of a generated config file. The parsed start is the current validation, which
+parses the model files. The imported start also executes every model file, as the
+validation did before the model classes were imported lazily.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.cold_start
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from importlib.util import spec_from_file_location, module_from_spec
+import yaml
+
+APP_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(APP_HOME, "configs/config.yaml")
+MODEL_COUNTS = [1, 5, 20]
+TEMPLATE_MODELS = ["ChatGPTModel", "LLAMA2"]
+REPEATS = 5
+
+
+def write_config(model_count:int, config_file:str)->None:
+    """
+    Writes a config file with copies of the template models
+
+    Args:
+        model_count: The number of models of the config file
+        config_file: The path of the config file
+    """
+    with open(CONFIG_FILE, "r", encoding="utf-8") as file:
+        config = yaml.safe_load(file)
+    models = {}
+    for index in range(model_count):
+        template = TEMPLATE_MODELS[index % len(TEMPLATE_MODELS)]
+        key = template if index < len(TEMPLATE_MODELS) else f"{template}{index}"
+        models[key] = config["Models"][template]
+    config["Models"] = models
+    config["GroupChatAgents"] = {}
+    with open(config_file, "w", encoding="utf-8") as file:
+        yaml.safe_dump(config, file)
+
+
+def start(imported:bool, config_file:str)->dict:
+    """
+    Starts the page in this interpreter
+
+    Args:
+        imported: Whether the model files are executed as well
+        config_file: The path of the config file
+
+    Returns:
+        The import time and the load time of the models in milliseconds
+        and the number of loaded modules
+    """
+    start_time = time.perf_counter()
+    # pylint: disable=import-outside-toplevel,unused-import
+    import app_utils
+    from backend.backend import ConfigRegistry
+    import_time = time.perf_counter()
+    models = ConfigRegistry(config_file, APP_HOME).get_models()
+    if imported:
+        for model_meta_info in models.values():
+            module_name = f"models.{os.path.basename(model_meta_info.llm_model_file)[:-3]}"
+            spec = spec_from_file_location(module_name, model_meta_info.llm_model_file)
+            module = module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+    return {"import_ms": (import_time - start_time) * 1000,
+            "models_ms": (time.perf_counter() - import_time) * 1000,
+            "modules": len(sys.modules)}
+
+
+def time_start(imported:bool, config_file:str)->dict:
+    """
+    Measures the start of the page in new interpreters
+
+    Args:
+        imported: Whether the model files are executed as well
+        config_file: The path of the config file
+
+    Returns:
+        The median import time and load time of the models in milliseconds
+        and the number of loaded modules
+    """
+    starts = []
+    for _ in range(REPEATS):
+        result = subprocess.run([sys.executable, "-m", "benchmarks.cold_start",
+                                 "imported" if imported else "parsed", config_file],
+                                cwd=APP_HOME, check=True, capture_output=True, text=True)
+        starts.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {"import_ms": statistics.median(start["import_ms"] for start in starts),
+            "models_ms": statistics.median(start["models_ms"] for start in starts),
+            "modules": starts[-1]["modules"]}
+
+
+def main()->None:
+    """
+    Prints the cold start of the parsed and of the imported model files for each number
+    of models
+    """
+    print(f"{'models':>7} {'files':>9} {'import ms':>10} {'models ms':>10} {'modules':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for model_count in MODEL_COUNTS:
+            config_file = os.path.join(directory, f"config_{model_count}.yaml")
+            write_config(model_count, config_file)
+            for name, imported in [("parsed", False), ("imported", True)]:
+                result = time_start(imported, config_file)
+                print(f"{model_count:>7} {name:>9} {result['import_ms']:>10.1f}"
+                      f" {result['models_ms']:>10.1f} {result['modules']:>8}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        print(json.dumps(start(sys.argv[1] == "imported", sys.argv[2])))
+    else:
+        main()
@@ -0,0 +1,119 @@
+"""
+This script measures the server CPU time and the bytes sent to the browser to replay
+a synthetic MetaGPT group chat, in which several roles stream long messages in turn.
+The per token replay rebuilds the message with its subheader and the whole markdown text
+on every token, as the MetaGPT handler did before the tokens were coalesced.
+The coalesced replay sends the tokens through StreamlitCallbackHandler, which renders
+the message once and flushes the buffered tokens to its delta stream.
+The tokens are replayed without delay, so the flushes are triggered by the number of
+buffered tokens. The replay runs in a script of Streamlit's AppTest harness, the bytes
+are the size of the messages the script sends to the browser.
+
+Run it from the root of the repository, metagpt must be installed::
+
+    python -m benchmarks.group_chat_streaming
+"""
+import os
+from typing import List, Tuple
+from streamlit.testing.v1 import AppTest
+
+APP_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(APP_HOME, "configs/config.yaml")
+TIMEOUT = 600
+# The name, the role and the number of tokens of each message of the group chat
+MESSAGES = [("Alice", "Product Manager", 3000), ("Bob", "Architect", 2000),
+            ("Alex", "Engineer", 4000), ("Edward", "QA Engineer", 1000)]
+
+
+def get_messages()->List[Tuple[str, str, List[str]]]:
+    """
+    Creates the tokens of the messages of the group chat, markdown documents with
+    headings, lists and code blocks
+
+    Returns:
+        The name, the role and the tokens of each message
+    """
+    messages = []
+    for name, role, token_count in MESSAGES:
+        tokens = []
+        for index in range(token_count):
+            if index % 400 == 0:
+                tokens.append(f"\n\n## Section {index // 400}\n\n")
+            elif index % 200 == 100:
+                tokens.append("\n\n```python\n")
+            elif index % 200 == 140:
+                tokens.append("\n```\n\n")
+            elif index % 50 == 0:
+                tokens.append("\n- ")
+            else:
+                tokens.append(f" word{index}")
+        messages.append((name, role, tokens))
+    return messages
+
+
+def replay_group_chat()->None:
+    """
+    Replays the group chat and stores the CPU time and the bytes sent
+    """
+    # pylint: disable=import-outside-toplevel,reimported,redefined-outer-name
+    import time
+    from types import SimpleNamespace
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    from backend.backend import ConfigRegistry
+    from benchmarks.group_chat_streaming import APP_HOME, CONFIG_FILE, get_messages
+    from conversations.group_conversation import GroupConversation
+    from handlers.group_chat_handler import StreamlitCallbackHandler
+    context = get_script_run_ctx()
+    enqueue = context._enqueue # pylint: disable=protected-access
+    sent = {"messages": 0, "bytes": 0}
+    def count_and_enqueue(msg):
+        sent["messages"] += 1
+        sent["bytes"] += msg.ByteSize()
+        enqueue(msg)
+    context._enqueue = count_and_enqueue # pylint: disable=protected-access
+    group_agent = next(iter(ConfigRegistry(CONFIG_FILE, APP_HOME).get_group_agents().values()))
+    st.session_state['current_group_conversation'] = GroupConversation(group_agent=group_agent)
+    handler = StreamlitCallbackHandler("🤖", 10.0, st.empty())
+    start = time.process_time()
+    for name, role, tokens in get_messages():
+        if st.session_state["replay"] == "coalesced":
+            handler.on_new_message(SimpleNamespace(name=name, role=role))
+            for token in tokens:
+                handler.on_new_token_generated(token)
+            handler.on_message_end()
+            continue
+        with st.chat_message("assistant", avatar="🤖"):
+            placeholder = st.empty()
+        text = ""
+        for token in tokens:
+            text += token
+            with placeholder.container():
+                st.subheader(f"{name} - {role}")
+                st.markdown(text + "▌")
+        with placeholder.container():
+            st.subheader(f"{name} - {role}")
+            st.markdown(text)
+    st.session_state["result"] = {**sent, "cpu_ms": (time.process_time() - start) * 1000}
+
+
+def main()->None:
+    """
+    Prints the CPU time, the messages and the bytes sent for each replay
+    """
+    token_count = sum(token_count for _, _, token_count in MESSAGES)
+    print(f"{len(MESSAGES)} roles, {token_count} tokens")
+    print(f"{'replay':>10} {'cpu ms':>9} {'messages':>9} {'bytes':>12}")
+    for replay in ["per token", "coalesced"]:
+        app = AppTest.from_function(replay_group_chat, default_timeout=TIMEOUT)
+        app.session_state["replay"] = replay
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        result = app.session_state["result"]
+        print(f"{replay:>10} {result['cpu_ms']:>9.1f} {result['messages']:>9}"
+              f" {result['bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+This script measures the time a rerun spends rendering the history of a conversation
+It runs render_conversation without a streamlit server, so it measures the time to build
+the elements of the page and not the time of the browser to display them.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.history_rendering
+"""
+import time
+from types import SimpleNamespace
+import app_utils
+from app_utils import render_conversation
+from conversations.conversation import Conversation
+from models.base_model import BaseLLMModel
+
+TURNS = [10, 50, 100, 200, 400]
+REPEATS = 5
+
+
+def create_conversation(turns:int, key:str="benchmark")->Conversation:
+    """
+    Creates a conversation with the given number of turns
+
+    Args:
+        turns: The number of user and AI message pairs
+        key: The key of the model of the conversation
+
+    Returns:
+        The conversation
+    """
+    model = BaseLLMModel()
+    for turn in range(turns):
+        model.add_user_message(f"Question {turn}: how do I write a **markdown** list?")
+        model.add_ai_message(f"Answer {turn}:\n\n- first item\n- second item\n\n`code`")
+    return Conversation(conversation_topic="Benchmark", key=key, llm_model=model)
+
+
+def time_rerun(conversation:Conversation)->float:
+    """
+    Measures the average time to render the conversation
+
+    Args:
+        conversation: The conversation to render
+
+    Returns:
+        The average time of a rerun in milliseconds
+    """
+    model_used_by_user = SimpleNamespace(icon=None)
+    # A fragment renders nothing without a streamlit server, so the function itself is timed
+    render = getattr(render_conversation, "__wrapped__", render_conversation)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        render(conversation, model_used_by_user)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main()->None:
+    """
+    Prints the rerun time of the windowed and the full history for each history length
+    """
+    page_size = app_utils.HISTORY_PAGE_SIZE
+    print(f"{'turns':>6} {'windowed ms':>12} {'full ms':>10}")
+    for turns in TURNS:
+        conversation = create_conversation(turns)
+        app_utils.HISTORY_PAGE_SIZE = page_size
+        windowed = time_rerun(conversation)
+        app_utils.HISTORY_PAGE_SIZE = turns * 2
+        full = time_rerun(conversation)
+        print(f"{turns:>6} {windowed:>12.1f} {full:>10.1f}")
+    app_utils.HISTORY_PAGE_SIZE = page_size
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+This script measures the latency of ChatGPT requests to a local OpenAI compatible
+stand-in server over TLS. The warm requests borrow the pooled session, which keeps the
+connection alive between turns. The cold requests run without the pool, so openai opens
+a new session and a new TLS connection for each request, as before the pool.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.http_client_pool
+"""
+import shutil
+import statistics
+import time
+from contextlib import nullcontext
+from typing import List
+from models.base_langchain_model import BaseLangChainModel
+from models.chat_gpt import ChatGPT
+from models.http_client_pool import OPENAI_SESSION_POOL
+from tests.openai_stand_in import OpenAIStandIn
+from utils.async_runner import run_sync
+
+TURNS = 50
+
+
+async def time_turns(model:ChatGPT, pooled:bool)->List[float]:
+    """
+    Measures the latency of each turn of a conversation
+
+    Args:
+        model: The model which sends the requests to the stand-in server
+        pooled: Whether the requests borrow the pooled session
+
+    Returns:
+        The latency of each turn in milliseconds
+    """
+    latencies = []
+    for turn in range(TURNS):
+        start = time.perf_counter()
+        if pooled:
+            await model.aget_prompt_response(f"Question {turn}")
+        else:
+            await BaseLangChainModel.aget_prompt_response(model, f"Question {turn}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main()->None:
+    """
+    Prints the latency of the cold and the warm requests and the connections they used
+    """
+    server = OpenAIStandIn(use_tls=shutil.which("openssl") is not None)
+    run_sync(server.start())
+    print(f"{TURNS} turns against {server.base_url}")
+    print(f"{'requests':>9} {'first ms':>9} {'mean ms':>8} {'p50 ms':>7} {'connections':>12}")
+    trusted_certificate = server.trusted_certificate() if server.use_tls else nullcontext()
+    try:
+        with trusted_certificate:
+            for name, pooled in [("cold", False), ("warm", True)]:
+                connections = server.connection_count
+                model = ChatGPT(openai_api_key="sk-stand-in", openai_api_base=server.base_url)
+                latencies = run_sync(time_turns(model, pooled))
+                print(f"{name:>9} {latencies[0]:>9.1f} {statistics.mean(latencies[1:]):>8.1f}"
+                      f" {statistics.median(latencies[1:]):>7.1f}"
+                      f" {server.connection_count - connections:>12}")
+    finally:
+        run_sync(OPENAI_SESSION_POOL.close())
+        run_sync(server.close())
+
+
+if __name__ == "__main__":
+    main()
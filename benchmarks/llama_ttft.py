@@ -0,0 +1,132 @@
+"""
+This script measures the time to first token of the LLAMA2 model at turns 1, 5 and 20
+of a conversation. The full conversation resets the context of the model before each turn,
+so llama.cpp evaluates the whole prompt from token zero, as before the context was kept.
+The incremental conversation keeps the evaluated context between turns. The interleaved
+conversation shares the model with another conversation which takes a turn in between,
+so its context is restored from the saved state before each turn.
+The memory window holds all the turns, so no turn is evicted during the benchmark.
+
+Run it from the root of the repository with the path to a llama model file::
+
+    python -m benchmarks.llama_ttft /path/to/llama-2-7b-chat.gguf
+"""
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from langchain.callbacks.base import BaseCallbackHandler
+from models.llama2 import LLAMA2
+from models.llama_cache import LLAMA_WEIGHT_CACHE
+from utils.async_runner import run_sync
+
+TURNS = 20
+REPORTED_TURNS = [1, 5, 20]
+SYSTEM_MESSAGE = "You are a helpful assistant that responds in Markdown format."
+
+
+#pylint: disable=abstract-method
+class FirstTokenHandler(BaseCallbackHandler):
+    """
+    This class is used to record the time to first token of each call of the LLM
+    """
+
+    def __init__(self) -> None:
+        """
+        This is the constructor for the FirstTokenHandler class
+        """
+        self.start_time = 0.0
+        self.first_token_time:Optional[float] = None
+
+
+    def on_llm_start(self, serialized:Dict[str, Any], prompts:list[str], **kwargs) -> None:
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+
+
+    @property
+    def ttft_ms(self)->float:
+        """
+        This method is used to get the time to first token of the last call
+
+        Returns:
+            The time to first token in milliseconds
+        """
+        return ((self.first_token_time or time.perf_counter()) - self.start_time) * 1000
+
+
+def create_model(model_path:str)->LLAMA2:
+    """
+    Creates a LLAMA2 model whose memory holds all the turns of the benchmark
+
+    Args:
+        model_path: The path to the llama model file
+
+    Returns:
+        The model
+    """
+    return LLAMA2(system_message=SYSTEM_MESSAGE, memory_kvargs={"k": TURNS},
+                  model_path=model_path, streaming=True, temperature=0, max_tokens=32,
+                  n_ctx=4096, n_batch=128, verbose=False)
+
+
+def reset_context(model:LLAMA2)->None:
+    """
+    Clears the evaluated context of the shared model, the next call of the model
+    then evaluates the whole prompt
+
+    Args:
+        model: The model
+    """
+    entry = LLAMA_WEIGHT_CACHE.get_entry(model.llm.weight_cache_key)
+    with entry.lock:
+        entry.client.reset()
+        entry.owner = model.llm.conversation_id
+
+
+def time_turns(model_path:str, mode:str)->List[float]:
+    """
+    Measures the time to first token of each turn of a conversation
+
+    Args:
+        model_path: The path to the llama model file
+        mode: full, incremental or interleaved
+
+    Returns:
+        The time to first token of each turn in milliseconds
+    """
+    model = create_model(model_path)
+    other_model = create_model(model_path) if mode == "interleaved" else None
+    handler = FirstTokenHandler()
+    ttfts = []
+    for turn in range(TURNS):
+        if other_model is not None:
+            run_sync(other_model.aget_prompt_response(f"Tell me a fact about the number {turn}."))
+        if mode == "full":
+            reset_context(model)
+        run_sync(model.aget_prompt_response(
+            f"Question {turn}: explain in two sentences what a {turn}-sided polygon is.",
+            stream_handler=handler))
+        ttfts.append(handler.ttft_ms)
+    return ttfts
+
+
+def main()->None:
+    """
+    Prints the time to first token at the reported turns for each mode
+    """
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python -m benchmarks.llama_ttft /path/to/model")
+    model_path = sys.argv[1]
+    print(f"{'mode':>12} " + " ".join(f"{f'turn {turn} ms':>12}" for turn in REPORTED_TURNS))
+    for mode in ["full", "incremental", "interleaved"]:
+        ttfts = time_turns(model_path, mode)
+        print(f"{mode:>12} " + " ".join(f"{ttfts[turn - 1]:>12.1f}" for turn in REPORTED_TURNS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+This script measures the rerun latency of the chat page with Streamlit's AppTest harness
+For each interaction it times the rerun of the whole page and the rerun of the region
+of the page which the interaction belongs to, which is the rerun of its fragment.
+AppTest reruns the whole script even when the widget is in a fragment, so the page column
+is the cost of an interaction without fragments and the region column the cost with them.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.rerun_latency
+"""
+import os
+import time
+from typing import Callable, List, Optional
+from backend.backend import ConfigRegistry
+from benchmarks.history_rendering import create_conversation
+from conversations.conversation import Conversation
+from conversations.conversation_registry import ConversationRegistry
+from models.meta_info import ModelMetaInfo
+from streamlit.testing.v1 import AppTest
+
+APP_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(APP_HOME, "configs/config.yaml")
+CHAT_PAGE = os.path.join(APP_HOME, "pages", "01_Chat_With_LLMs.py")
+CONVERSATIONS = [10, 50, 200]
+TURNS = 100
+REPEATS = 5
+TIMEOUT = 60
+
+
+def sidebar_region()->None:
+    """
+    Renders the list of conversations of the chat page on its own
+    """
+    # pylint: disable=import-outside-toplevel,reimported,redefined-outer-name
+    import streamlit as st
+    from app_utils import get_current_conversation, load_conversation_registry, render_sidebar
+    with st.sidebar:
+        render_sidebar(get_current_conversation(), load_conversation_registry())
+
+
+def conversation_region()->None:
+    """
+    Renders the conversation of the chat page on its own
+    """
+    # pylint: disable=import-outside-toplevel,reimported,redefined-outer-name
+    import streamlit as st
+    from app_utils import get_current_conversation, render_conversation
+    render_conversation(get_current_conversation(), st.session_state['benchmark_model'])
+
+
+def create_app(script:Optional[Callable[[], None]], conversations:List[Conversation],
+               model_meta_info:ModelMetaInfo)->AppTest:
+    """
+    Creates the app of the chat page, or of a region of the page, with the conversations
+
+    Args:
+        script: The function which renders the region, the whole page if None
+        conversations: The conversations of the session, the last one is the current one
+        model_meta_info: The model of the conversations
+
+    Returns:
+        The app which was run once
+    """
+    if script is None:
+        app = AppTest.from_file(CHAT_PAGE, default_timeout=TIMEOUT)
+    else:
+        app = AppTest.from_function(script, default_timeout=TIMEOUT)
+    conversation_registry = ConversationRegistry()
+    for conversation in conversations:
+        conversation_registry.add(conversation)
+    app.session_state['conversation_registry'] = conversation_registry
+    app.session_state['current_conversation'] = conversations[-1]
+    app.session_state['benchmark_model'] = model_meta_info
+    return app.run()
+
+
+def click_current_conversation(app:AppTest)->None:
+    """
+    Clicks the current conversation in the sidebar
+
+    Args:
+        app: The app
+    """
+    conversation = app.session_state['current_conversation']
+    app.button(key=f"conversation_{conversation.conversation_id}").click()
+
+
+def click_load_earlier_messages(app:AppTest)->None:
+    """
+    Clicks the button which loads the earlier messages, from the first page of the history
+
+    Args:
+        app: The app
+    """
+    app.session_state['history_windows'] = {}
+    next(button for button in app.button if button.label.startswith("⬆️")).click()
+
+
+def time_interaction(app:AppTest, interact:Callable[[AppTest], None])->float:
+    """
+    Measures the average time of the rerun which follows an interaction
+
+    Args:
+        app: The app
+        interact: The function which interacts with the app
+
+    Returns:
+        The average time of a rerun in milliseconds
+    """
+    elapsed = 0.0
+    for _ in range(REPEATS):
+        interact(app)
+        start = time.perf_counter()
+        app.run()
+        elapsed += time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    return elapsed / REPEATS * 1000
+
+
+def main()->None:
+    """
+    Prints the rerun time of the page and of the region for each interaction
+    and number of conversations
+    """
+    models = ConfigRegistry(CONFIG_FILE, APP_HOME).get_models()
+    model_key, model_meta_info = next(iter(models.items()))
+    interactions = [("sidebar click", sidebar_region, click_current_conversation),
+                    ("load earlier", conversation_region, click_load_earlier_messages)]
+    print(f"{'interaction':>14} {'conversations':>14} {'page ms':>10} {'region ms':>10}")
+    for name, region, interact in interactions:
+        for count in CONVERSATIONS:
+            conversations = [create_conversation(TURNS, model_key) for _ in range(count)]
+            for conversation in conversations:
+                conversation.is_summarized = True
+            page = time_interaction(create_app(None, conversations, model_meta_info), interact)
+            region_time = time_interaction(create_app(region, conversations, model_meta_info),
+                                           interact)
+            print(f"{name:>14} {count:>14} {page:>10.1f} {region_time:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+This script measures the time a new session spends loading the models and group agents
+Before the process wide snapshot every session validated the config file once for the
+models and once for the group agents. With the snapshot only the first session of the
+process validates it, the next sessions copy the validated models and group agents.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.session_config_load
+"""
+import os
+import statistics
+import time
+from typing import Callable, List
+from backend.backend import ConfigRegistry
+from schema.config import pydantic_validate_config
+
+APP_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(APP_HOME, "configs/config.yaml")
+SESSIONS = 20
+
+
+def load_session_validated()->None:
+    """
+    Loads the models and group agents of a session by validating the config file for each
+    """
+    _ = pydantic_validate_config(CONFIG_FILE, APP_HOME).models
+    _ = pydantic_validate_config(CONFIG_FILE, APP_HOME).group_chat_agents
+
+
+def load_session_from_snapshot()->None:
+    """
+    Loads the models and group agents of a session from the process wide snapshot
+    """
+    config_registry = ConfigRegistry(CONFIG_FILE, APP_HOME)
+    config_registry.get_models()
+    config_registry.get_group_agents()
+
+
+def time_sessions(load_session:Callable[[], None])->List[float]:
+    """
+    Measures the load time of each new session
+
+    Args:
+        load_session: The function which loads a session
+
+    Returns:
+        The load time of each session in milliseconds
+    """
+    load_times = []
+    for _ in range(SESSIONS):
+        start = time.perf_counter()
+        load_session()
+        load_times.append((time.perf_counter() - start) * 1000)
+    return load_times
+
+
+def main()->None:
+    """
+    Prints the load time of the first session and of the next sessions
+    """
+    print(f"{SESSIONS} sessions loading {CONFIG_FILE}")
+    print(f"{'load':>10} {'first ms':>9} {'next mean ms':>13} {'next p50 ms':>12}")
+    for name, load_session in [("validated", load_session_validated),
+                               ("snapshot", load_session_from_snapshot)]:
+        load_times = time_sessions(load_session)
+        print(f"{name:>10} {load_times[0]:>9.2f} {statistics.mean(load_times[1:]):>13.2f}"
+              f" {statistics.median(load_times[1:]):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
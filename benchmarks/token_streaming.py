@@ -0,0 +1,115 @@
+"""
+This script measures the server CPU time and the bytes sent to the browser to stream
+a 4,000 token response from a fake streaming LLM through StreamlitDisplayHandler.
+The per token stream renders the whole text on every token, as before the tokens were
+buffered. The other streams flush the buffered tokens in the full, blocks and delta render
+modes. The fake LLM emits the tokens without delay, so the flushes are triggered by the
+number of buffered tokens. The handler runs in a script of Streamlit's AppTest harness,
+the bytes are the size of the messages the script sends to the browser.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.token_streaming
+"""
+from typing import Any, List, Optional
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.llms.base import LLM
+from streamlit.testing.v1 import AppTest
+
+TOKENS = 4000
+TIMEOUT = 600
+STREAMS = [("per token", {"render_mode": "full", "flush_tokens": 1}),
+           ("full", {"render_mode": "full", "flush_tokens": 32}),
+           ("blocks", {"render_mode": "blocks", "flush_tokens": 32}),
+           ("delta", {"render_mode": "delta", "flush_tokens": 32})]
+
+
+def get_tokens(count:int)->List[str]:
+    """
+    Creates the tokens of a markdown response with paragraphs, lists and code blocks
+
+    Args:
+        count: The number of tokens
+
+    Returns:
+        The tokens
+    """
+    tokens = []
+    for index in range(count):
+        if index % 200 == 100:
+            tokens.append("\n\n```python\n")
+        elif index % 200 == 140:
+            tokens.append("\n```\n\n")
+        elif index % 50 == 0:
+            tokens.append("\n\n- " if index % 100 else "\n\n")
+        else:
+            tokens.append(f" word{index}")
+    return tokens
+
+
+class FakeStreamingLLM(LLM):
+    """
+    This class is a LangChain LLM which streams a fixed list of tokens
+    """
+
+    tokens: List[str]
+
+
+    @property
+    def _llm_type(self)->str:
+        return "fake-streaming"
+
+
+    def _call(self, prompt:str, stop:Optional[List[str]]=None,
+              run_manager:Optional[CallbackManagerForLLMRun]=None, **kwargs:Any)->str:
+        for token in self.tokens:
+            if run_manager is not None:
+                run_manager.on_llm_new_token(token)
+        return "".join(self.tokens)
+
+
+def stream_response()->None:
+    """
+    Streams the response in a placeholder and stores the CPU time and the bytes sent
+    """
+    # pylint: disable=import-outside-toplevel,reimported,redefined-outer-name
+    import time
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    from benchmarks.token_streaming import FakeStreamingLLM, get_tokens, TOKENS
+    from models.base_langchain_model import StreamlitDisplayHandler
+    context = get_script_run_ctx()
+    enqueue = context._enqueue # pylint: disable=protected-access
+    sent = {"messages": 0, "bytes": 0}
+    def count_and_enqueue(msg):
+        sent["messages"] += 1
+        sent["bytes"] += msg.ByteSize()
+        enqueue(msg)
+    context._enqueue = count_and_enqueue # pylint: disable=protected-access
+    llm = FakeStreamingLLM(tokens=get_tokens(TOKENS))
+    handler = StreamlitDisplayHandler(st.empty(), stream_key="benchmark",
+                                      **st.session_state["stream_arguments"])
+    start = time.process_time()
+    llm.predict("Write a long answer", callbacks=[handler])
+    st.session_state["result"] = {**sent, "cpu_ms": (time.process_time() - start) * 1000}
+
+
+def main()->None:
+    """
+    Prints the CPU time, the messages and the bytes sent for each stream
+    """
+    print(f"{TOKENS} tokens")
+    print(f"{'stream':>10} {'cpu ms':>9} {'messages':>9} {'bytes':>12}")
+    for name, stream_arguments in STREAMS:
+        app = AppTest.from_function(stream_response, default_timeout=TIMEOUT)
+        app.session_state["stream_arguments"] = stream_arguments
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        result = app.session_state["result"]
+        print(f"{name:>10} {result['cpu_ms']:>9.1f} {result['messages']:>9}"
+              f" {result['bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 """
 This module contains the Conversation class
 """
+from concurrent.futures import Future
 from typing import Optional
+from uuid import uuid4
 from pydantic import BaseModel, Field
 from models.base_model import BaseLLMModel
 
@@ -16,6 +18,32 @@ class Conversation(BaseModel):
     is_summarized: Optional[bool] = Field(
                                     description="Whether the conversation is summarized or not",
                                     default=False)
+    conversation_id: str = Field(description="The stable id of the conversation",
+                                 default_factory=lambda: uuid4().hex)
+    summary_future: Optional[Future] = Field(description=("The summarization of the"
+                                                          " conversation which is running"),
+                                             default=None, exclude=True)
+
+
+    def update_topic(self)->bool:
+        """
+        This method is used to set the topic to the summary once the summarization is done
+        If the summarization failed the topic is not changed
+
+        Returns:
+            Whether the topic was changed
+        """
+        if self.summary_future is None or not self.summary_future.done():
+            return False
+        future, self.summary_future = self.summary_future, None
+        self.is_summarized = True
+        if future.cancelled() or future.exception() is not None:
+            return False
+        summary = future.result().strip()
+        if not summary or summary == self.conversation_topic:
+            return False
+        self.conversation_topic = summary
+        return True
 
 
     class Config:
@@ -0,0 +1,228 @@
+"""
+This module contains the registry of the conversations of a session
+"""
+import re
+from typing import Dict, Iterator, List, Optional, Set
+from conversations.conversation import Conversation
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+
+def get_terms(text:str)->Set[str]:
+    """
+    Gets the search terms of a text, the lower case words of the text
+
+    Args:
+        text: The text
+
+    Returns:
+        The terms of the text
+    """
+    return set(_TERM_PATTERN.findall(text.lower()))
+
+
+class ConversationRegistry:
+    """
+    This class is used to store the conversations of a session in the order they were started
+    The conversations are indexed by id and by the key of their model, and an inverted index
+    maps the terms of the topics and of the messages to the conversations which contain them.
+    The messages are indexed when a search needs them, from the last indexed message,
+    so a search only reads the messages added since the previous search.
+    """
+
+    def __init__(self) -> None:
+        """
+        This is the constructor for the ConversationRegistry class
+        """
+        self._conversations:Dict[str, Conversation] = {}
+        self._model_conversations:Dict[str, Dict[str, Conversation]] = {}
+        self._term_index:Dict[str, Set[str]] = {}
+        self._topics:Dict[str, str] = {}
+        self._topic_terms:Dict[str, Set[str]] = {}
+        self._message_terms:Dict[str, Set[str]] = {}
+        self._indexed_messages:Dict[str, int] = {}
+
+
+    def __len__(self)->int:
+        return len(self._conversations)
+
+
+    def __iter__(self)->Iterator[Conversation]:
+        return iter(list(self._conversations.values()))
+
+
+    def __contains__(self, conversation:object)->bool:
+        return isinstance(conversation, Conversation) \
+            and self._conversations.get(conversation.conversation_id) is conversation
+
+
+    def add(self, conversation:Conversation)->None:
+        """
+        This method is used to add a conversation to the registry
+
+        Args:
+            conversation: The conversation
+        """
+        conversation_id = conversation.conversation_id
+        self._conversations[conversation_id] = conversation
+        self._model_conversations.setdefault(conversation.key, {})[conversation_id] = conversation
+        self._topics[conversation_id] = ""
+        self._topic_terms[conversation_id] = set()
+        self._message_terms[conversation_id] = set()
+        self._indexed_messages[conversation_id] = 0
+
+
+    def remove(self, conversation:Conversation)->None:
+        """
+        This method is used to remove a conversation from the registry and from the index
+        Conversations which are not in the registry are ignored
+
+        Args:
+            conversation: The conversation
+        """
+        if conversation not in self:
+            return
+        conversation_id = conversation.conversation_id
+        del self._conversations[conversation_id]
+        model_conversations = self._model_conversations[conversation.key]
+        del model_conversations[conversation_id]
+        if not model_conversations:
+            del self._model_conversations[conversation.key]
+        terms = self._topic_terms.pop(conversation_id) | self._message_terms.pop(conversation_id)
+        self._remove_terms(conversation_id, terms)
+        del self._topics[conversation_id]
+        del self._indexed_messages[conversation_id]
+
+
+    def remove_model_conversations(self, model_key:str)->List[Conversation]:
+        """
+        This method is used to remove the conversations of a model
+
+        Args:
+            model_key: The key of the model
+
+        Returns:
+            The removed conversations
+        """
+        conversations = self.get_conversations(model_key)
+        for conversation in conversations:
+            self.remove(conversation)
+        return conversations
+
+
+    def get(self, conversation_id:str)->Optional[Conversation]:
+        """
+        This method is used to get a conversation by id
+
+        Args:
+            conversation_id: The id of the conversation
+
+        Returns:
+            The conversation or None if it is not in the registry
+        """
+        return self._conversations.get(conversation_id)
+
+
+    def get_conversations(self, model_key:Optional[str]=None)->List[Conversation]:
+        """
+        This method is used to get the conversations in the order they were started
+
+        Args:
+            model_key: The key of the model of the conversations, all the conversations if None
+
+        Returns:
+            The conversations
+        """
+        if model_key is None:
+            return list(self._conversations.values())
+        return list(self._model_conversations.get(model_key, {}).values())
+
+
+    def search(self, query:str)->List[Conversation]:
+        """
+        This method is used to find the conversations whose topic or messages contain
+        all the terms of the query, the last term may be the beginning of a word
+
+        Args:
+            query: The query
+
+        Returns:
+            The matching conversations in the order they were started,
+            all the conversations if the query has no terms
+        """
+        query_terms = _TERM_PATTERN.findall(query.lower())
+        if not query_terms:
+            return self.get_conversations()
+        *terms, last_term = query_terms
+        for conversation in self._conversations.values():
+            self._index(conversation)
+        matches:Optional[Set[str]] = None
+        for term in terms:
+            term_matches = self._term_index.get(term, set())
+            matches = term_matches if matches is None else matches & term_matches
+        prefix_matches = set()
+        for term, conversation_ids in self._term_index.items():
+            if term.startswith(last_term):
+                prefix_matches |= conversation_ids
+        matches = prefix_matches if matches is None else matches & prefix_matches
+        return [conversation for conversation_id, conversation in self._conversations.items()
+                if conversation_id in matches]
+
+
+    def _index(self, conversation:Conversation)->None:
+        """
+        This method is used to index the changed topic and the new messages of a conversation
+
+        Args:
+            conversation: The conversation
+        """
+        conversation_id = conversation.conversation_id
+        message_terms = self._message_terms[conversation_id]
+        if conversation.conversation_topic != self._topics[conversation_id]:
+            self._topics[conversation_id] = conversation.conversation_topic
+            topic_terms = get_terms(conversation.conversation_topic)
+            self._remove_terms(conversation_id,
+                               self._topic_terms[conversation_id] - topic_terms - message_terms)
+            self._add_terms(conversation_id, topic_terms)
+            self._topic_terms[conversation_id] = topic_terms
+        messages = conversation.llm_model.get_messages()
+        indexed_messages = self._indexed_messages[conversation_id]
+        if len(messages) < indexed_messages:
+            # The messages were cleared, the terms of the removed messages are dropped
+            self._remove_terms(conversation_id, message_terms - self._topic_terms[conversation_id])
+            message_terms.clear()
+            indexed_messages = 0
+        for message in messages[indexed_messages:]:
+            terms = get_terms(message.message) - message_terms
+            self._add_terms(conversation_id, terms)
+            message_terms |= terms
+        self._indexed_messages[conversation_id] = len(messages)
+
+
+    def _add_terms(self, conversation_id:str, terms:Set[str])->None:
+        """
+        This method is used to add a conversation to the index of terms
+
+        Args:
+            conversation_id: The id of the conversation
+            terms: The terms
+        """
+        for term in terms:
+            self._term_index.setdefault(term, set()).add(conversation_id)
+
+
+    def _remove_terms(self, conversation_id:str, terms:Set[str])->None:
+        """
+        This method is used to remove a conversation from the index of terms
+
+        Args:
+            conversation_id: The id of the conversation
+            terms: The terms
+        """
+        for term in terms:
+            conversation_ids = self._term_index.get(term)
+            if conversation_ids is None:
+                continue
+            conversation_ids.discard(conversation_id)
+            if not conversation_ids:
+                del self._term_index[term]
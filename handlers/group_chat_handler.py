@@ -2,19 +2,26 @@
 This file contains the class used to handle the callback from MetaGPT to Streamlit
 """
 import os
+import time
+from uuid import uuid4
 import streamlit as st
 from metagpt.callbacks import BaseCallbackHandler, SenderInfo
-from ui_elements.components import render_group_ai_message
+from ui_elements.components import DeltaStream, render_group_ai_message
 from schema.group_message import GroupMessage
+from schema.stream_metrics import StreamMetricsRecorder
 from schema.attachment_message import AttachmentMessage
 
 
 class StreamlitCallbackHandler(BaseCallbackHandler):
     """
     This class is used to handle the callback from MetaGPT to Streamlit
+    The tokens are buffered and rendered at most every flush_interval_ms
+    milliseconds or flush_tokens tokens, only the new tokens are sent to the
+    delta stream of the message
     """
 
-    def __init__(self, profile_pic:str, investment:float, cost_container):
+    def __init__(self, profile_pic:str, investment:float, cost_container,
+                 flush_interval_ms:float=200, flush_tokens:int=64):
         """
         This method is used to initialize the class
 
@@ -22,6 +29,8 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
             profile_pic: The path to the profile pic
             investment: The investment
             cost_container: The cost container
+            flush_interval_ms: The milliseconds after which the buffered tokens are rendered
+            flush_tokens: The number of buffered tokens after which they are rendered
         """
         self.investement = investment
         self.group_conversation = st.session_state['current_group_conversation']
@@ -35,6 +44,13 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
         self.investement = investment
         self.cost_container = cost_container
         self.placeholder = None
+        self.stream_placeholder = None
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_tokens = flush_tokens
+        self.pending_tokens:list[str] = []
+        self.last_flush_time = time.monotonic()
+        self.delta_stream = None
+        self.metrics_recorder = StreamMetricsRecorder()
 
 
     def on_new_workspace_generated(self, workspace_path: str) -> None:
@@ -60,10 +76,17 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
                                           icon=self.profile_pic,
                                           message="",
                                           message_type="AI")
-        container, placeholder = render_group_ai_message(self.group_message, None, None)
+        self.delta_stream = DeltaStream(f"stream_{uuid4().hex}")
+        # The subheader and the delta stream are rendered once, a flush only sends the delta
+        container, placeholder, stream_placeholder = render_group_ai_message(
+            self.group_message, None, None, stream_key=self.delta_stream.key)
         self.container = container
         self.placeholder = placeholder
+        self.stream_placeholder = stream_placeholder
         self.text = ""
+        self.pending_tokens.clear()
+        self.last_flush_time = time.monotonic()
+        self.metrics_recorder.start()
 
     def on_new_token_generated(self, token: str) -> None:
         """
@@ -72,18 +95,34 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
         Args:
             token: The token
         """
-        self.text += token
-        self.group_message.message = self.text +"▌"
-        with self.placeholder.container():
-            st.subheader(self.group_message.sender_name)
-            st.markdown(self.group_message.message)
+        self.metrics_recorder.record_token()
+        self.pending_tokens.append(token)
+        if len(self.pending_tokens) >= self.flush_tokens or \
+           time.monotonic() - self.last_flush_time >= self.flush_interval:
+            self.flush()
+
+
+    def flush(self) -> None:
+        """
+        This method is used to render the buffered tokens
+        """
+        delta = "".join(self.pending_tokens)
+        self.text += delta
+        self.pending_tokens.clear()
+        self.last_flush_time = time.monotonic()
+        self.group_message.message = self.text
+        self.delta_stream.write(self.stream_placeholder, delta)
 
 
     def on_message_end(self) -> None:
         """
         This method is used to handle the message end event
         """
+        self.metrics_recorder.stop()
+        self.text += "".join(self.pending_tokens)
+        self.pending_tokens.clear()
         self.group_message.message = self.text
+        self.group_message.metrics = self.metrics_recorder.get_metrics()
         render_group_ai_message(self.group_message, self.container, self.placeholder, show_time=True)
         self.group_conversation.add_message(self.group_message)
         self.group_message = None
@@ -1,7 +1,10 @@
 """
 This module implements the base class for all LangChain models
 """
-from typing import Dict, Any, Union, Optional
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Union, Optional, Literal
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.chat_models.base import BaseChatModel
 from langchain import PromptTemplate
@@ -9,30 +12,212 @@ from langchain.llms.base import LLM
 from langchain.chat_models.base import SimpleChatModel
 from langchain.llms.fake import FakeListLLM
 from langchain.memory import ConversationBufferWindowMemory
+from langchain.memory.chat_memory import BaseChatMemory
 from langchain.chains import LLMChain
 from langchain.schema.messages import SystemMessage, HumanMessage
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder, HumanMessagePromptTemplate
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from models.base_model import BaseLLMModel
+from models.llama_cache import separate_context
+from models.message_store import MessageStoreHistory
+from models.rolling_summary_memory import RollingSummaryMemory
+from models.token_budget_memory import TokenBudgetMemory
+from schema.stream_metrics import StreamMetrics, StreamMetricsRecorder
+from ui_elements.components import DeltaStream
+from utils.cancellation import CANCELLATION_STATS, CancellationHandler, CancellationToken, \
+                               GenerationCancelled
+from utils.util import split_markdown_blocks
 
 
 #pylint: disable=abstract-method
 class StreamlitDisplayHandler(BaseCallbackHandler):
     """
     This class is used to display the output of the LLM in streamlit
+    The handler can be called from the event loop or an executor thread, the tokens are
+    only displayed from a script thread of the session, never from the shared threads.
+    The tokens are buffered and flushed to the container at most every
+    flush_interval_ms milliseconds or flush_tokens tokens.
+    In the delta render mode only the new tokens are sent to the delta stream
+    mounted in the container, instead of the whole text on every flush.
+    In the blocks render mode the completed markdown blocks are frozen as separate
+    elements and only the block which is still open is rendered again on a flush.
+    The latency metrics of the last response are stored in metrics.
+    The handler can be created without a container to start a request before the
+    page is rendered, the tokens are buffered until the script streams them with stream.
     """
-    def __init__(self, container:st.container, initial_text:str="", display_method:str='markdown'):
+    # Call the handler in the event loop instead of an executor thread
+    run_inline = True
+
+    def __init__(self, container:Optional[st.container], initial_text:str="",
+                 display_method:str='markdown',
+                 flush_interval_ms:float=100, flush_tokens:int=32,
+                 render_mode:Literal['full', 'delta', 'blocks']='blocks',
+                 stream_key:Optional[str]=None):
         """
         This is the constructor for the StreamlitDisplayHandler class
 
         Args:
-            container: The streamlit container to display the output in
+            container: The streamlit container to display the output in,
+                       None to buffer the output until a container is attached
             initial_text: The initial text to display
             display_method: The method to use to display the text
+            flush_interval_ms: The milliseconds after which the buffered tokens are displayed
+            flush_tokens: The number of buffered tokens after which they are displayed
+            render_mode: Whether to render the full text, only the new tokens or
+                         only the open markdown block on a flush
+            stream_key: The key of the delta stream, required for the delta render mode
         """
+        if render_mode == 'delta' and stream_key is None:
+            raise ValueError("stream_key is required for the delta render mode")
         self.container = container
         self.text = initial_text
         self.display_method = display_method
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_tokens = flush_tokens
+        self.pending_tokens:list[str] = []
+        self.last_flush_time = time.monotonic()
+        self.render_mode = render_mode
+        self.stream_key = stream_key
+        self.delta_stream = DeltaStream(stream_key) if stream_key else None
+        self.open_block = initial_text
+        self.blocks_container = None
+        self.open_block_placeholder = None
+        self.metrics_recorder = StreamMetricsRecorder()
+        self.metrics:Optional[StreamMetrics] = None
+        self.lock = threading.RLock()
+        self.flush_from_script = False
+
+
+    def stream(self, container:st.container, future:Future)->Any:
+        """
+        This method is used to display the output which is buffered or still streaming
+        in the container until the response is complete
+        The tokens are flushed from the calling script thread, so the script can be
+        stopped by streamlit to handle a rerun while the response is streaming
+        
+        Args:
+            container: The streamlit container to display the output in
+            future: The future of the response
+        
+        Returns:
+            The result of the future
+        """
+        with self.lock:
+            self.container = container
+            self.flush_from_script = True
+            # Display the text streamed before in the new container
+            self.pending_tokens.insert(0, self.text)
+            self.text = ""
+            self.open_block = ""
+            self.blocks_container = None
+            self.open_block_placeholder = None
+            if self.stream_key:
+                self.delta_stream = DeltaStream(self.stream_key)
+        while True:
+            try:
+                result = future.result(timeout=self.flush_interval)
+                break
+            except FutureTimeoutError:
+                with self.lock:
+                    if self.pending_tokens:
+                        self.flush()
+        with self.lock:
+            self.flush(final=True)
+            self.reset()
+        return result
+
+
+    def displays_on_calling_thread(self)->bool:
+        """
+        This method is used to check whether the tokens are displayed by the thread
+        which calls the handler, which must be a script thread of the session
+        The tokens received on the event loop or an executor thread are buffered
+        until the script streams them, these threads are shared by all the sessions.
+        Must be called with the lock held
+
+        Returns:
+            True if the calling thread displays the tokens else False
+        """
+        return self.container is not None and not self.flush_from_script and \
+            get_script_run_ctx(suppress_warning=True) is not None
+
+
+    def reset(self)->None:
+        """
+        This method is used to clear the streamed text so the handler can stream a new response
+        """
+        self.text = ""
+        self.open_block = ""
+        self.blocks_container = None
+        self.open_block_placeholder = None
+
+
+    def flush(self, final:bool=False)->None:
+        """
+        This method is used to display the buffered tokens in streamlit
+        
+        Args:
+            final: Whether the response is complete, the cursor is not shown if True
+        """
+        delta = "".join(self.pending_tokens)
+        self.text += delta
+        self.pending_tokens.clear()
+        self.last_flush_time = time.monotonic()
+        if self.render_mode == 'delta':
+            self.delta_stream.write(self.container, delta, done=final)
+            return
+        if self.render_mode == 'blocks':
+            self.render_blocks(delta, final)
+            return
+        self.display(self.container, self.text if final else self.text+"▌")
+
+
+    def render_blocks(self, delta:str, final:bool)->None:
+        """
+        This method is used to freeze the completed markdown blocks and render the open block
+        
+        Args:
+            delta: The text added since the last flush
+            final: Whether the response is complete, the cursor is not shown if True
+        """
+        if self.blocks_container is None:
+            self.blocks_container = self.container.container()
+            self.open_block_placeholder = self.blocks_container.empty()
+        completed_blocks, self.open_block = split_markdown_blocks(self.open_block + delta)
+        for block in completed_blocks:
+            self.display(self.open_block_placeholder, block)
+            self.open_block_placeholder = self.blocks_container.empty()
+        self.display(self.open_block_placeholder,
+                     self.open_block if final else self.open_block+"▌")
+
+
+    def display(self, placeholder, text:str)->None:
+        """
+        This method is used to display the text in the placeholder with the display method
+        
+        Args:
+            placeholder: The placeholder to display the text in
+            text: The text to display
+        """
+        display_function = getattr(placeholder, self.display_method, None)
+        if display_function is None:
+            raise ValueError(f"Invalid display_method: {self.display_method}")
+        display_function(text)
+
+
+    def on_llm_start(self, serialized:Dict[str, Any], prompts:list[str], **kwargs) -> None:
+        """
+        This method is used to record the start of the request to the LLM
+        
+        Args:
+            serialized: The serialized LLM
+            prompts: The prompts given to the LLM
+            **kwargs: The keyword arguments
+        """
+        with self.lock:
+            self.metrics_recorder.start()
+            self.metrics = None
 
 
     def on_llm_new_token(self, token: str, **kwargs) -> None:
@@ -43,12 +228,14 @@ class StreamlitDisplayHandler(BaseCallbackHandler):
             token: The newly generated token
             **kwargs: The keyword arguments
         """
-        self.text += token
-        display_function = getattr(self.container, self.display_method, None)
-        if display_function is not None:
-            display_function(self.text+"▌")
-        else:
-            raise ValueError(f"Invalid display_method: {self.display_method}")
+        with self.lock:
+            self.metrics_recorder.record_token()
+            self.pending_tokens.append(token)
+            if not self.displays_on_calling_thread():
+                return
+            if len(self.pending_tokens) >= self.flush_tokens or \
+               time.monotonic() - self.last_flush_time >= self.flush_interval:
+                self.flush()
 
 
     def on_llm_end(self, response:str, **kwargs) -> None:
@@ -58,7 +245,14 @@ class StreamlitDisplayHandler(BaseCallbackHandler):
             response: The response from the LLM
             **kwargs: The keyword arguments
         """
-        self.text = ""
+        with self.lock:
+            self.metrics_recorder.stop()
+            self.metrics = self.metrics_recorder.get_metrics()
+            if not self.displays_on_calling_thread():
+                # The output is displayed by the script thread
+                return
+            self.flush(final=True)
+            self.reset()
 
 
 class BaseLangChainModel(BaseLLMModel):
@@ -86,8 +280,6 @@ class BaseLangChainModel(BaseLLMModel):
             self.llm = FakeListLLM(**kvargs)
         else:
             self.llm = llm(**kvargs)
-        if memory_kvargs is None:
-            memory_kvargs = {}
         self.system_message = system_message
         if isinstance(self.llm, BaseChatModel):
             messages = []
@@ -96,68 +288,150 @@ class BaseLangChainModel(BaseLLMModel):
             messages.append(MessagesPlaceholder(variable_name="chat_history"))
             messages.append(HumanMessagePromptTemplate.from_template("{question}"))
             self.prompt = ChatPromptTemplate(messages=messages)
-            self.memory = ConversationBufferWindowMemory(**memory_kvargs,
-                                                         memory_key="chat_history",
-                                                         return_messages=True)
+            self.memory = self.get_memory(memory_kvargs, return_messages=True,
+                                          prompt_text=system_message or "")
         else:
-            if system_message:
-                s_message = f"System:{system_message}\n"
-            else:
-                s_message = ""
-            template = s_message + """
+            template = self.get_system_prefix(system_message) + """
 {chat_history}
 Human: {question}
 AI:"""
             self.prompt = PromptTemplate(template=template,
                                          input_variables=["chat_history", "question"])
-            self.memory = ConversationBufferWindowMemory(**memory_kvargs,
-                                                         memory_key="chat_history")
+            self.memory = self.get_memory(memory_kvargs, return_messages=False,
+                                          prompt_text=template.format(chat_history="",
+                                                                      question=""))
         self.llm_chain = LLMChain(llm=self.llm,
                                   memory=self.memory,
                                   prompt=self.prompt)
 
 
 
-    def get_prompt_response(self, message:str,
-                             stream_handler:Optional[BaseCallbackHandler]=None)->str:
+    def get_memory(self, memory_kvargs:Optional[Dict[str, Any]], return_messages:bool,
+                   prompt_text:str)->BaseChatMemory:
+        """
+        This method is used to create the memory selected by memory_type in the memory arguments
+        The window memory keeps the last k turns, the token_budget memory keeps the
+        most recent messages which fit in context_size minus response_tokens and the prompt,
+        the rolling_summary memory keeps the last k turns and a summary of the older turns.
+        The memory reads and writes the message store of the model.
+        
+        Args:
+            memory_kvargs: The keyword arguments for the memory
+            return_messages: Whether the memory returns messages instead of a string
+            prompt_text: The text of the prompt without the history and the question
+        
+        Returns:
+            The memory of the conversation
+        
+        Raises:
+            ValueError: If the memory_type is invalid or the budget can not be computed
+        """
+        memory_kvargs = dict(memory_kvargs or {})
+        memory_type = memory_kvargs.pop("memory_type", "window")
+        chat_memory = MessageStoreHistory(self.messages)
+        if memory_type == "window":
+            return ConversationBufferWindowMemory(**memory_kvargs, chat_memory=chat_memory,
+                                                  memory_key="chat_history",
+                                                  return_messages=return_messages)
+        if memory_type == "token_budget":
+            context_size = memory_kvargs.pop("context_size", getattr(self.llm, "n_ctx", None))
+            response_tokens = memory_kvargs.pop("response_tokens",
+                                                getattr(self.llm, "max_tokens", None)) or 0
+            if context_size is None:
+                raise ValueError("context_size is required for the token_budget memory")
+            max_token_limit = context_size - response_tokens - \
+                              self.llm.get_num_tokens(prompt_text)
+            if max_token_limit <= 0:
+                raise ValueError(f"The prompt and {response_tokens} response tokens do not fit"
+                                 f" in the context size {context_size}")
+            return TokenBudgetMemory(**memory_kvargs, chat_memory=chat_memory, llm=self.llm,
+                                     max_token_limit=max_token_limit,
+                                     memory_key="chat_history",
+                                     return_messages=return_messages)
+        if memory_type == "rolling_summary":
+            return RollingSummaryMemory(**memory_kvargs, chat_memory=chat_memory, llm=self.llm,
+                                        memory_key="chat_history",
+                                        return_messages=return_messages)
+        raise ValueError(f"Invalid memory_type: {memory_type}")
+
+
+    @staticmethod
+    def get_system_prefix(system_message:Optional[str])->str:
+        """
+        This method is used to get the text which starts the prompt of a completion LLM
+        
+        Args:
+            system_message: The system message
+        
+        Returns:
+            The system message prefix of the prompt
+        """
+        if system_message:
+            return f"System:{system_message}\n"
+        return ""
+
+
+    async def aget_prompt_response(self, message:str,
+                                   stream_handler:Optional[BaseCallbackHandler]=None,
+                                   cancellation_token:Optional[CancellationToken]=None)->str:
         """
-        This method is used to get a response to a prompt
+        This method is used to get a response to a prompt asynchronously
+        If the cancellation token is cancelled the LLM stops at the next token
+        and the partial response is saved to the memory
         
         Args:
             message: The message to give to the LLM
             stream_handler: if passed response is streamed via handler
+            cancellation_token: if passed the generation can be stopped with the token
         
         Returns:
-            The response from the LLM
+            The response from the LLM, partial if the generation was cancelled
         """
-        self.add_user_message(message=message)
-        if stream_handler:
-            ai_response = self.llm_chain.predict(question=message, callbacks=[stream_handler])
+        callbacks = [stream_handler] if stream_handler else []
+        cancellation_handler = None
+        if cancellation_token is not None:
+            cancellation_handler = CancellationHandler(cancellation_token)
+            callbacks.append(cancellation_handler)
+        started_at = time.time()
+        try:
+            ai_response = await self.llm_chain.apredict(question=message,
+                                                        callbacks=callbacks or None)
+        except GenerationCancelled:
+            ai_response = "".join(cancellation_handler.tokens)
+            # The chain does not save the turn when the LLM is stopped
+            self.memory.save_context({"question": message}, {"text": ai_response})
+            CANCELLATION_STATS.record_cancelled(len(cancellation_handler.tokens))
         else:
-            ai_response = self.llm_chain.predict(question=message)
-        self.add_ai_message(message=ai_response)
+            if cancellation_handler is not None:
+                CANCELLATION_STATS.record_completed(len(cancellation_handler.tokens))
+        # The memory saves the turn to the message store when the chain returns
+        user_message, ai_message = self.messages[-2], self.messages[-1]
+        user_message.created_at = started_at
+        ai_message.metrics = getattr(stream_handler, "metrics", None)
         return ai_response
 
 
-    def get_prompt_response_without_memory(self, message:str,
-                                           stream_handler:Optional[BaseCallbackHandler]
-                                           =None)->str:
+    async def aget_prompt_response_without_memory(self, message:str,
+                                                  stream_handler:Optional[BaseCallbackHandler]
+                                                  =None, max_tokens:Optional[int]=None)->str:
         """
-        This method is used to get a response to a prompt
-        The message is given to the LLM without any memory
+        This method is used to get a response to a prompt asynchronously
+        The message is given to the LLM without any memory and outside the evaluated
+        context of the conversation, such as the prompt to summarize the conversation
         
         Args:
             message: The message to give to the LLM
             stream_handler: if passed response is streamed via handler
+            max_tokens: The maximum number of tokens of the response
         
         Returns:
             The response from the LLM
         """
-        if stream_handler:
-            if isinstance(self.llm, BaseChatModel):
-                return self.llm(callbacks=[stream_handler],
-                                messages=[HumanMessage(content=message)]).content
-            return self.llm(callbacks=[stream_handler], prompt=message)
-        if isinstance(self.llm, BaseChatModel):
-            return self.llm([HumanMessage(content=message)]).content
-        return self.llm(prompt=message)
+        callbacks = [stream_handler] if stream_handler else None
+        llm_kvargs = {} if max_tokens is None else {"max_tokens": max_tokens}
+        with separate_context(self.llm) as llm:
+            if isinstance(llm, BaseChatModel):
+                response = await llm.apredict_messages([HumanMessage(content=message)],
+                                                       callbacks=callbacks, **llm_kvargs)
+                return response.content
+            return await llm.apredict(message, callbacks=callbacks, **llm_kvargs)
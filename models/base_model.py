@@ -1,10 +1,15 @@
 """
 This file contains the base model class that all models should inherit from
 """
+import asyncio
+from functools import partial
 from typing import  List, Optional
-from datetime import datetime
 from langchain.callbacks.base import BaseCallbackHandler
 from schema.message import Message
+from schema.stream_metrics import StreamMetrics
+from models.message_store import MessageStore
+from utils.async_runner import run_sync
+from utils.cancellation import CancellationToken
 
 #pylint: disable=too-few-public-methods
 class FakeLLM:
@@ -50,56 +55,108 @@ class BaseLLMModel:
         """
         self.system_message = system_message
         self.llm = FakeLLM(**kvargs)
-        self.messages = []
+        self.messages = MessageStore()
 
 
-    def get_prompt_response(self, message:str,
-                            stream_handler:Optional[BaseCallbackHandler]=None)->str:
+    async def aget_prompt_response(self, message:str,
+                                   stream_handler:Optional[BaseCallbackHandler]=None,
+                                   cancellation_token:Optional[CancellationToken]=None)->str:
         """
-        This method is used to get a response to a prompt
+        This method is used to get a response to a prompt asynchronously
         
         Args:
             message: The message to give to the LLM
             stream_handler: if passed response is streamed via handler
+            cancellation_token: if passed the generation can be stopped with the token
         
         Returns:
             The response from the LLM
+        
+        Raises:
+            GenerationCancelled: If the token is cancelled before the generation starts
         """
+        if cancellation_token is not None:
+            cancellation_token.raise_if_cancelled()
         self.add_user_message(message=message)
         if stream_handler:
             raise NotImplementedError("This Model does not have streaming capabilities")
-        ai_response = self.llm.give_response_to_prompt(messages=self.messages,
-                                                       system_prompt=self.system_message)
+        # The LLM is blocking, it runs on an executor thread so the shared event loop is free
+        ai_response = await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.llm.give_response_to_prompt, messages=self.messages,
+                          system_prompt=self.system_message))
         self.add_ai_message(message=ai_response)
         return ai_response
 
 
-    def get_prompt_response_without_memory(self, message:str,
-                                           stream_handler:Optional[BaseCallbackHandler]=None)->str:
+    async def aget_prompt_response_without_memory(self, message:str,
+                                                  stream_handler:Optional[BaseCallbackHandler]
+                                                  =None, max_tokens:Optional[int]=None)->str:
         """
-        This method is used to get a response to a prompt
+        This method is used to get a response to a prompt asynchronously
         The message is given to the LLM without any memory
         
         Args:
             message: The message to give to the LLM
             stream_handler: if passed response is streamed via handler
+            max_tokens: The maximum number of tokens of the response, if supported by the LLM
         
         Returns:
             The response from the LLM
         """
         if stream_handler:
             raise NotImplementedError("This Model does not have streaming capabilities")
-        return self.llm.give_response_to_prompt(messages=[message], system_prompt=None)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.llm.give_response_to_prompt, messages=[message],
+                          system_prompt=None))
+
+
+    def get_prompt_response(self, message:str,
+                            stream_handler:Optional[BaseCallbackHandler]=None,
+                            cancellation_token:Optional[CancellationToken]=None)->str:
+        """
+        This method is used to get a response to a prompt
+        It runs aget_prompt_response on the process wide event loop
+        
+        Args:
+            message: The message to give to the LLM
+            stream_handler: if passed response is streamed via handler
+            cancellation_token: if passed the generation can be stopped with the token
+        
+        Returns:
+            The response from the LLM
+        """
+        return run_sync(self.aget_prompt_response(message, stream_handler, cancellation_token))
+
+
+    def get_prompt_response_without_memory(self, message:str,
+                                           stream_handler:Optional[BaseCallbackHandler]=None,
+                                           max_tokens:Optional[int]=None)->str:
+        """
+        This method is used to get a response to a prompt
+        The message is given to the LLM without any memory
+        It runs aget_prompt_response_without_memory on the process wide event loop
+        
+        Args:
+            message: The message to give to the LLM
+            stream_handler: if passed response is streamed via handler
+            max_tokens: The maximum number of tokens of the response, if supported by the LLM
+        
+        Returns:
+            The response from the LLM
+        """
+        return run_sync(self.aget_prompt_response_without_memory(message, stream_handler,
+                                                                 max_tokens))
 
 
-    def add_ai_message(self, message:str):
+    def add_ai_message(self, message:str, metrics:Optional[StreamMetrics]=None):
         """
         This method is used to add an AI message to the conversation
         
         Args:
             message: The message to add to the conversation
+            metrics: The latency metrics of the response, if it was streamed
         """
-        self.messages.append(Message(message=message, message_type='AI', timestamp=datetime.now()))
+        self.messages.append(message, 'AI', metrics=metrics)
 
 
     def add_user_message(self, message:str):
@@ -109,15 +166,14 @@ class BaseLLMModel:
         Args:
             message: The message to add to the conversation
         """
-        self.messages.append(Message(message=message, message_type='USER', 
-                                     timestamp=datetime.now()))
+        self.messages.append(message, 'USER')
 
 
-    def get_messages(self)->List[Message]:
+    def get_messages(self)->MessageStore:
         """
         This method is used to get the messages in the conversation
         
         Returns:
-            The messages in the conversation
+            The message store of the conversation
         """
         return self.messages
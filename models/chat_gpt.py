@@ -1,25 +1,90 @@
 """
-ChatGPT is a class that inherits from BaseLangChainModel and uses 
+ChatGPT is a class that inherits from BaseLangChainModel and uses
 the ChatOpenAI class to generate text.
 """
 from typing import Dict, Any, Optional
+import openai
+from langchain.callbacks.base import BaseCallbackHandler
 from langchain.chat_models import ChatOpenAI
 from models.base_langchain_model import BaseLangChainModel
+from models.http_client_pool import OPENAI_SESSION_POOL
+from utils.cancellation import CancellationToken
 
 
 class ChatGPT(BaseLangChainModel):
     """
     This is the class for the ChatGPT model
+    The requests use the process wide pool of HTTP sessions
     """
     def __init__(self, system_message:Optional[str] = None,
                  memory_kvargs:Dict[Any, Any]=None, **kvargs) -> None:
         """
         This is the constructor for the ChatGPT class
-        
+
         Args:
             system_message: The system message to give to the LLM
             memory_kvargs: The kvarguments for the memory
-            **kvargs: The arguments for the LLM
+            **kvargs: The arguments for the LLM, client_pool_size and client_idle_timeout
+                      set the limits of the process wide HTTP session pool
         """
+        OPENAI_SESSION_POOL.configure(max_size=kvargs.pop("client_pool_size", None),
+                                      idle_timeout=kvargs.pop("client_idle_timeout", None))
         super().__init__(ChatOpenAI, system_message,
                          memory_kvargs, **kvargs)
+
+
+    def _get_pool_key(self)->tuple[Optional[str], str]:
+        """
+        This method is used to get the API key and base URL of the model
+
+        Returns:
+            The API key and the base URL
+        """
+        return self.llm.openai_api_key, self.llm.openai_api_base or openai.api_base
+
+
+    async def aget_prompt_response(self, message:str,
+                                   stream_handler:Optional[BaseCallbackHandler]=None,
+                                   cancellation_token:Optional[CancellationToken]=None)->str:
+        """
+        This method is used to get a response to a prompt asynchronously
+
+        Args:
+            message: The message to give to the LLM
+            stream_handler: if passed response is streamed via handler
+            cancellation_token: if passed the generation can be stopped with the token
+
+        Returns:
+            The response from the LLM
+        """
+        async with OPENAI_SESSION_POOL.session(*self._get_pool_key()) as session:
+            token = openai.aiosession.set(session)
+            try:
+                return await super().aget_prompt_response(message, stream_handler,
+                                                          cancellation_token)
+            finally:
+                openai.aiosession.reset(token)
+
+
+    async def aget_prompt_response_without_memory(self, message:str,
+                                                  stream_handler:Optional[BaseCallbackHandler]
+                                                  =None, max_tokens:Optional[int]=None)->str:
+        """
+        This method is used to get a response to a prompt asynchronously
+        The message is given to the LLM without any memory
+
+        Args:
+            message: The message to give to the LLM
+            stream_handler: if passed response is streamed via handler
+            max_tokens: The maximum number of tokens of the response
+
+        Returns:
+            The response from the LLM
+        """
+        async with OPENAI_SESSION_POOL.session(*self._get_pool_key()) as session:
+            token = openai.aiosession.set(session)
+            try:
+                return await super().aget_prompt_response_without_memory(message, stream_handler,
+                                                                          max_tokens)
+            finally:
+                openai.aiosession.reset(token)
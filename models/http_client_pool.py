@@ -0,0 +1,152 @@
+"""
+This module implements a process wide pool of HTTP client sessions
+so that conversations reuse the keep-alive connections to the API endpoints
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+import aiohttp
+
+
+@dataclass
+class PooledSession:
+    """
+    This class is used to store a client session in the pool
+    """
+    session: aiohttp.ClientSession
+    loop: asyncio.AbstractEventLoop
+    in_use: int = 0
+    last_used: float = 0.0
+    idle_handle: Optional[asyncio.TimerHandle] = None
+
+
+class ClientSessionPool:
+    """
+    This class is used to share aiohttp client sessions keyed by API key and base URL
+    The pool is bounded in size and the sessions which are idle for longer than
+    the idle timeout are closed
+    """
+
+    def __init__(self, max_size:int=8, idle_timeout:float=300.0,
+                 connection_limit:int=20) -> None:
+        """
+        This is the constructor for the ClientSessionPool class
+
+        Args:
+            max_size: The maximum number of sessions in the pool
+            idle_timeout: The seconds after which an idle session or connection is closed
+            connection_limit: The maximum number of connections of a session
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.connection_limit = connection_limit
+        self._sessions:OrderedDict[tuple, PooledSession] = OrderedDict()
+
+
+    def configure(self, max_size:Optional[int]=None, idle_timeout:Optional[float]=None)->None:
+        """
+        This method is used to change the limits of the pool
+
+        Args:
+            max_size: The maximum number of sessions in the pool
+            idle_timeout: The seconds after which an idle session is closed
+        """
+        if max_size is not None:
+            self.max_size = max_size
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+
+
+    @asynccontextmanager
+    async def session(self, api_key:Optional[str],
+                      base_url:Optional[str])->AsyncIterator[aiohttp.ClientSession]:
+        """
+        This method is used to borrow the session for the API key and base URL
+        Sessions are bound to the running event loop
+
+        Args:
+            api_key: The API key
+            base_url: The base URL of the API
+
+        Yields:
+            The client session
+        """
+        loop = asyncio.get_running_loop()
+        key = (api_key, base_url, id(loop))
+        pooled = self._sessions.get(key)
+        if pooled is None or pooled.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit,
+                                             keepalive_timeout=self.idle_timeout)
+            pooled = PooledSession(session=aiohttp.ClientSession(connector=connector), loop=loop)
+            self._sessions[key] = pooled
+        self._sessions.move_to_end(key)
+        pooled.in_use += 1
+        try:
+            yield pooled.session
+        finally:
+            pooled.in_use -= 1
+            pooled.last_used = time.monotonic()
+            if pooled.in_use == 0:
+                if pooled.idle_handle is not None:
+                    pooled.idle_handle.cancel()
+                pooled.idle_handle = loop.call_later(self.idle_timeout, self._close_if_idle,
+                                                     key, pooled)
+            await self._evict(loop)
+
+
+    def _close_if_idle(self, key:tuple, pooled:PooledSession)->None:
+        """
+        This method is used to close a session which was not used during the idle timeout
+        It is called on the event loop of the session
+
+        Args:
+            key: The key of the session in the pool
+            pooled: The pooled session
+        """
+        pooled.idle_handle = None
+        if self._sessions.get(key) is not pooled or pooled.in_use > 0:
+            return
+        if time.monotonic() - pooled.last_used < self.idle_timeout:
+            return
+        del self._sessions[key]
+        pooled.loop.create_task(pooled.session.close())
+
+
+    async def _evict(self, loop:asyncio.AbstractEventLoop)->None:
+        """
+        This method is used to close the idle sessions of the running event loop
+        which timed out or are over the pool size
+
+        Args:
+            loop: The running event loop
+        """
+        now = time.monotonic()
+        size = len(self._sessions)
+        for key, pooled in list(self._sessions.items()):
+            if pooled.loop.is_closed():
+                del self._sessions[key]
+                size -= 1
+                continue
+            if pooled.in_use > 0 or pooled.loop is not loop:
+                continue
+            if size > self.max_size or now - pooled.last_used > self.idle_timeout:
+                del self._sessions[key]
+                size -= 1
+                await pooled.session.close()
+
+
+    async def close(self)->None:
+        """
+        This method is used to close all the sessions of the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        for key, pooled in list(self._sessions.items()):
+            if pooled.loop is loop:
+                del self._sessions[key]
+                await pooled.session.close()
+
+
+OPENAI_SESSION_POOL = ClientSessionPool()
@@ -2,8 +2,9 @@
 LLAMA2 model
 """
 from typing import Dict, Any, Optional
-from langchain.llms import LlamaCpp
 from models.base_langchain_model import BaseLangChainModel
+from models.llama_cache import SharedLlamaCpp, LLAMA_WEIGHT_CACHE, \
+                               LLAMA_CONVERSATION_STATES, LLAMA_PREFIX_STATES
 
 
 class LLAMA2(BaseLangChainModel):
@@ -19,6 +20,16 @@ class LLAMA2(BaseLangChainModel):
         Args:
             system_message: The system message to give to the LLM
             memory_kvargs: The kvarguments for the memory
-            **kvargs: The arguments for the LLM
+            **kvargs: The arguments for the LLM, weight_cache_budget_mb sets the
+                      memory budget of the process wide model cache,
+                      state_cache_budget_mb the budget of the saved conversation contexts
+                      and prefix_cache_budget_mb the budget of the saved system prompts
         """
-        super().__init__(LlamaCpp, system_message, memory_kvargs, **kvargs)
+        if "weight_cache_budget_mb" in kvargs:
+            LLAMA_WEIGHT_CACHE.set_memory_budget(kvargs.pop("weight_cache_budget_mb"))
+        if "state_cache_budget_mb" in kvargs:
+            LLAMA_CONVERSATION_STATES.set_memory_budget(kvargs.pop("state_cache_budget_mb"))
+        if "prefix_cache_budget_mb" in kvargs:
+            LLAMA_PREFIX_STATES.set_memory_budget(kvargs.pop("prefix_cache_budget_mb"))
+        kvargs["system_prefix"] = self.get_system_prefix(system_message)
+        super().__init__(SharedLlamaCpp, system_message, memory_kvargs, **kvargs)
@@ -0,0 +1,530 @@
+"""
+This module implements a process wide cache of the loaded llama models
+so that conversations using the same model file share the weights
+"""
+import os
+import asyncio
+import weakref
+from contextlib import contextmanager
+from functools import partial
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock, RLock
+from typing import Any, Dict, Iterator, List, Optional, Hashable
+from uuid import uuid4
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.llms import LlamaCpp
+from langchain.pydantic_v1 import Field, root_validator
+
+
+# The arguments of LlamaCpp which are used to load the model, the rest are used per call
+MODEL_PARAM_NAMES = ["rope_freq_scale", "rope_freq_base", "lora_path", "lora_base",
+                     "n_ctx", "n_parts", "seed", "f16_kv", "logits_all", "vocab_only",
+                     "use_mlock", "n_threads", "n_batch", "use_mmap",
+                     "last_n_tokens_size", "verbose"]
+LLAMA_IMPORT_ERROR = ("Could not import llama-cpp-python library. "
+                      "Please install the llama-cpp-python library to "
+                      "use this embedding model: pip install llama-cpp-python")
+
+
+@dataclass
+class LlamaCacheEntry:
+    """
+    This class is used to store a loaded llama model in the cache
+    """
+    client: Any
+    size_bytes: int
+    ref_count: int = 0
+    lock: RLock = field(default_factory=RLock)
+    owner: Optional[str] = None
+
+
+class LlamaWeightCache:
+    """
+    This class is used to share loaded llama models across conversations and sessions
+    The models are reference counted and the idle ones are evicted in LRU order
+    when the memory budget is exceeded
+    """
+
+    def __init__(self, memory_budget_mb:Optional[int]=None) -> None:
+        """
+        This is the constructor for the LlamaWeightCache class
+
+        Args:
+            memory_budget_mb: The memory budget for the loaded models, no limit if None
+        """
+        self.memory_budget_mb = memory_budget_mb
+        self._entries:OrderedDict[tuple, LlamaCacheEntry] = OrderedDict()
+        # The lock of each model key, held while the model is loaded
+        self._loading_locks:Dict[tuple, Lock] = {}
+        self._lock = Lock()
+
+
+    @staticmethod
+    def get_key(model_path:str, model_params:Dict[str, Any])->tuple:
+        """
+        This method is used to get the cache key of a model
+
+        Args:
+            model_path: The path to the model file
+            model_params: The parameters used to load the model
+
+        Returns:
+            The cache key
+        """
+        main_params = ("n_ctx", "n_batch", "n_gpu_layers")
+        other_params = tuple(sorted((key, repr(value)) for key, value in model_params.items()
+                                    if key not in main_params))
+        return (os.path.abspath(model_path),
+                *(model_params.get(param) for param in main_params),
+                other_params)
+
+
+    def set_memory_budget(self, memory_budget_mb:Optional[int])->None:
+        """
+        This method is used to set the memory budget and evict the idle models over it
+
+        Args:
+            memory_budget_mb: The memory budget for the loaded models, no limit if None
+        """
+        with self._lock:
+            self.memory_budget_mb = memory_budget_mb
+            self._evict()
+
+
+    def acquire(self, model_path:str, model_params:Dict[str, Any])->tuple[tuple, LlamaCacheEntry]:
+        """
+        This method is used to get a loaded model, the model is loaded if it is not cached
+        The model is loaded without the cache lock so the cached models can be acquired
+        and released meanwhile, the concurrent acquires of the same model wait for its load
+
+        Args:
+            model_path: The path to the model file
+            model_params: The parameters used to load the model
+
+        Returns:
+            The cache key and the cache entry of the model
+        """
+        key = self.get_key(model_path, model_params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return key, self._add_reference(key, entry)
+            loading_lock = self._loading_locks.setdefault(key, Lock())
+        with loading_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return key, self._add_reference(key, entry)
+            # pylint: disable=import-outside-toplevel
+            from llama_cpp import Llama
+            client = Llama(model_path, **model_params)
+            with self._lock:
+                entry = LlamaCacheEntry(client=client, size_bytes=os.path.getsize(model_path))
+                self._entries[key] = entry
+                return key, self._add_reference(key, entry)
+
+
+    def _add_reference(self, key:tuple, entry:LlamaCacheEntry)->LlamaCacheEntry:
+        """
+        This method is used to add a reference to a cached model
+        Must be called with the cache lock held
+
+        Args:
+            key: The cache key of the model
+            entry: The cache entry of the model
+
+        Returns:
+            The cache entry of the model
+        """
+        entry.ref_count += 1
+        self._entries.move_to_end(key)
+        self._evict()
+        return entry
+
+
+    def get_entry(self, key:tuple)->Optional[LlamaCacheEntry]:
+        """
+        This method is used to get the cache entry of an acquired model
+
+        Args:
+            key: The cache key of the model
+
+        Returns:
+            The cache entry of the model if it is cached else None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+
+    def release(self, key:tuple)->None:
+        """
+        This method is used to release a model acquired by a conversation
+
+        Args:
+            key: The cache key of the model
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.ref_count = max(0, entry.ref_count - 1)
+            self._evict()
+
+
+    def _evict(self)->None:
+        """
+        This method is used to evict the least recently used idle models over the memory budget
+        Must be called with the cache lock held
+        """
+        if self.memory_budget_mb is None:
+            return
+        budget = self.memory_budget_mb * 1024 * 1024
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        for key in list(self._entries.keys()):
+            if total <= budget:
+                break
+            entry = self._entries[key]
+            if entry.ref_count > 0:
+                continue
+            total -= entry.size_bytes
+            del self._entries[key]
+
+
+LLAMA_WEIGHT_CACHE = LlamaWeightCache()
+
+
+class LlamaStateCache:
+    """
+    This class is used to keep saved llama states in LRU order under a memory budget
+    """
+
+    def __init__(self, memory_budget_mb:Optional[int]=None) -> None:
+        """
+        This is the constructor for the LlamaStateCache class
+
+        Args:
+            memory_budget_mb: The memory budget for the saved states, no limit if None
+        """
+        self.memory_budget_mb = memory_budget_mb
+        self._states:OrderedDict[Hashable, Any] = OrderedDict()
+        self._size_bytes = 0
+        self._lock = Lock()
+
+
+    @staticmethod
+    def _state_size(state:Any)->int:
+        """
+        This method is used to get the size of a saved llama state
+
+        Args:
+            state: The saved llama state
+
+        Returns:
+            The size of the state in bytes
+        """
+        return getattr(state, "llama_state_size", 0)
+
+
+    def set_memory_budget(self, memory_budget_mb:Optional[int])->None:
+        """
+        This method is used to set the memory budget and evict the states over it
+
+        Args:
+            memory_budget_mb: The memory budget for the saved states, no limit if None
+        """
+        with self._lock:
+            self.memory_budget_mb = memory_budget_mb
+            self._evict()
+
+
+    def put(self, key:Hashable, state:Any)->None:
+        """
+        This method is used to store a saved llama state
+
+        Args:
+            key: The key of the state
+            state: The saved llama state
+        """
+        with self._lock:
+            if key in self._states:
+                self._size_bytes -= self._state_size(self._states.pop(key))
+            self._states[key] = state
+            self._size_bytes += self._state_size(state)
+            self._evict()
+
+
+    def get(self, key:Hashable)->Optional[Any]:
+        """
+        This method is used to get a saved llama state
+
+        Args:
+            key: The key of the state
+
+        Returns:
+            The saved llama state if found else None
+        """
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+            return state
+
+
+    def pop(self, key:Hashable)->Optional[Any]:
+        """
+        This method is used to remove a saved llama state
+
+        Args:
+            key: The key of the state
+
+        Returns:
+            The saved llama state if found else None
+        """
+        with self._lock:
+            state = self._states.pop(key, None)
+            if state is not None:
+                self._size_bytes -= self._state_size(state)
+            return state
+
+
+    def _evict(self)->None:
+        """
+        This method is used to evict the least recently used states over the memory budget
+        Must be called with the cache lock held
+        """
+        if self.memory_budget_mb is None:
+            return
+        budget = self.memory_budget_mb * 1024 * 1024
+        while self._states and self._size_bytes > budget:
+            _, state = self._states.popitem(last=False)
+            self._size_bytes -= self._state_size(state)
+
+
+# The evaluated context of the conversations that are not on the model right now
+LLAMA_CONVERSATION_STATES = LlamaStateCache()
+# The evaluated system prompt prefixes which new conversations start from
+LLAMA_PREFIX_STATES = LlamaStateCache()
+
+
+def _release_conversation(key:tuple, conversation_id:str)->None:
+    """
+    This function is used to release the model and the saved state of a conversation
+
+    Args:
+        key: The cache key of the model
+        conversation_id: The id of the conversation
+    """
+    LLAMA_CONVERSATION_STATES.pop((key, conversation_id))
+    entry = LLAMA_WEIGHT_CACHE.get_entry(key)
+    if entry is not None and entry.owner == conversation_id:
+        entry.owner = None
+    LLAMA_WEIGHT_CACHE.release(key)
+
+
+class SharedLlamaCpp(LlamaCpp):
+    """
+    This class is a LlamaCpp which gets the loaded model from the process wide cache
+    The conversation only owns the generation parameters and the memory, the calls to
+    the shared model are serialized.
+    The evaluated context of the conversation is kept between turns, llama.cpp then
+    only evaluates the tokens after the longest common prefix with the new prompt.
+    When another conversation used the model in between, the context is restored
+    from its saved state.
+    A new conversation starts from the saved state of its system prompt prefix,
+    which is shared by all the conversations with the same model and prefix.
+    """
+
+    weight_cache_key: Any = None
+    # LlamaCpp types the grammar with a LlamaGrammar forward reference which is never resolved,
+    # the grammar string is converted to a LlamaGrammar by the validator
+    grammar: Optional[Any] = None
+    conversation_id: str = Field(default_factory=lambda: uuid4().hex)
+    system_prefix: Optional[str] = None
+
+
+    def __init__(self, **kvargs) -> None:
+        """
+        This is the constructor for the SharedLlamaCpp class
+
+        Args:
+            **kvargs: The arguments for LlamaCpp
+        """
+        super().__init__(**kvargs)
+        weakref.finalize(self, _release_conversation, self.weight_cache_key,
+                         self.conversation_id)
+
+
+    # pylint: disable=no-self-argument
+    @root_validator()
+    def validate_environment(cls, values:Dict)->Dict:
+        """
+        This method replaces the LlamaCpp validator to get the model from the cache
+        The grammar is validated and loaded as LlamaCpp does
+
+        Args:
+            values: The values of the model
+
+        Returns:
+            The values with the client and the grammar set
+
+        Raises:
+            ValueError: If both grammar and grammar_path are set or the model can not be loaded
+        """
+        model_path = values["model_path"]
+        model_params = {key: values[key] for key in MODEL_PARAM_NAMES if key in values}
+        if values.get("n_gpu_layers") is not None:
+            model_params["n_gpu_layers"] = values["n_gpu_layers"]
+        model_params.update(values.get("model_kwargs") or {})
+        if values.get("grammar") and values.get("grammar_path"):
+            raise ValueError(("Can only pass in one of grammar and grammar_path. Received "
+                              f"grammar={values['grammar']!r} and "
+                              f"grammar_path={values['grammar_path']!r}."))
+        try:
+            # pylint: disable=import-outside-toplevel
+            from llama_cpp import LlamaGrammar
+        except ImportError as exc:
+            raise ImportError(LLAMA_IMPORT_ERROR) from exc
+        if isinstance(values.get("grammar"), str):
+            values["grammar"] = LlamaGrammar.from_string(values["grammar"])
+        elif values.get("grammar_path"):
+            values["grammar"] = LlamaGrammar.from_file(values["grammar_path"])
+        try:
+            key, entry = LLAMA_WEIGHT_CACHE.acquire(model_path, model_params)
+        except Exception as exc:
+            raise ValueError((f"Could not load Llama model from path: {model_path}. "
+                              f"Received error {exc}")) from exc
+        values["client"] = entry.client
+        values["weight_cache_key"] = key
+        return values
+
+
+    def _call(self, prompt:str, stop:Optional[List[str]]=None, run_manager:Any=None,
+              **kwargs:Any)->str:
+        """
+        This method is used to call the shared model while holding its lock
+
+        Args:
+            prompt: The prompt for the model
+            stop: The stop words
+            run_manager: The callback manager of the run
+            **kwargs: The keyword arguments for the call
+
+        Returns:
+            The generated text
+        """
+        entry = LLAMA_WEIGHT_CACHE.get_entry(self.weight_cache_key)
+        with entry.lock:
+            self._restore_context(entry)
+            return super()._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+
+    async def _acall(self, prompt:str, stop:Optional[List[str]]=None, run_manager:Any=None,
+                     **kwargs:Any)->str:
+        """
+        This method is used to call the shared model from the event loop
+        llama.cpp is blocking so the call is run on an executor thread
+
+        Args:
+            prompt: The prompt for the model
+            stop: The stop words
+            run_manager: The async callback manager of the run
+            **kwargs: The keyword arguments for the call
+
+        Returns:
+            The generated text
+        """
+        sync_run_manager = None
+        if run_manager is not None:
+            sync_run_manager = CallbackManagerForLLMRun(
+                run_id=run_manager.run_id,
+                handlers=run_manager.handlers,
+                inheritable_handlers=run_manager.inheritable_handlers,
+                parent_run_id=run_manager.parent_run_id,
+                tags=run_manager.tags,
+                inheritable_tags=run_manager.inheritable_tags,
+                metadata=run_manager.metadata,
+                inheritable_metadata=run_manager.inheritable_metadata)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self._call, prompt, stop=stop, run_manager=sync_run_manager, **kwargs))
+
+
+    def _restore_context(self, entry:LlamaCacheEntry)->None:
+        """
+        This method is used to make the evaluated context of this conversation
+        the current context of the shared model
+        Must be called with the lock of the entry held
+
+        Args:
+            entry: The cache entry of the model
+        """
+        if entry.owner == self.conversation_id:
+            return
+        if entry.owner is not None:
+            LLAMA_CONVERSATION_STATES.put((self.weight_cache_key, entry.owner),
+                                          entry.client.save_state())
+        state = LLAMA_CONVERSATION_STATES.pop((self.weight_cache_key, self.conversation_id))
+        if state is not None:
+            entry.client.load_state(state)
+        elif self.system_prefix:
+            self._load_system_prefix(entry)
+        # Without a saved state the prompt is matched against whatever the model holds
+        entry.owner = self.conversation_id
+
+
+    def _load_system_prefix(self, entry:LlamaCacheEntry)->None:
+        """
+        This method is used to load the evaluated system prompt prefix into the shared model
+        The prefix is evaluated and saved the first time it is used with the model
+        Must be called with the lock of the entry held
+
+        Args:
+            entry: The cache entry of the model
+        """
+        # LlamaCpp prepends a space to the prompt before tokenizing it
+        prefix_tokens = tuple(entry.client.tokenize(b" " + self.system_prefix.encode("utf-8")))
+        prefix_key = (self.weight_cache_key, prefix_tokens)
+        state = LLAMA_PREFIX_STATES.get(prefix_key)
+        if state is not None:
+            entry.client.load_state(state)
+            return
+        entry.client.reset()
+        entry.client.eval(list(prefix_tokens))
+        LLAMA_PREFIX_STATES.put(prefix_key, entry.client.save_state())
+
+
+@contextmanager
+def separate_context(llm:Any)->Iterator[Any]:
+    """
+    This function is used to run a side task, such as a summary, with the LLM of a conversation
+    without replacing the evaluated context of the conversation.
+    A SharedLlamaCpp is copied with its own conversation id, the context of the conversation
+    is saved when the copy takes the model and restored at its next turn.
+    The context of the copy is dropped at the end of the task.
+    The other LLMs are given as they are.
+
+    Args:
+        llm: The LLM of the conversation
+
+    Yields:
+        The LLM to run the task with
+    """
+    if not isinstance(llm, SharedLlamaCpp):
+        yield llm
+        return
+    # The copy is constructed from the values since copy() drops the excluded fields
+    # such as the callbacks, the model is not acquired again
+    task_llm = SharedLlamaCpp.construct(llm.__fields_set__,
+                                        **{**llm.__dict__, "conversation_id": uuid4().hex})
+    try:
+        yield task_llm
+    finally:
+        LLAMA_CONVERSATION_STATES.pop((task_llm.weight_cache_key, task_llm.conversation_id))
+        entry = LLAMA_WEIGHT_CACHE.get_entry(task_llm.weight_cache_key)
+        if entry is not None:
+            with entry.lock:
+                if entry.owner == task_llm.conversation_id:
+                    entry.owner = None
@@ -0,0 +1,199 @@
+"""
+This module implements the append only message log of a conversation
+The log is read by the renderer and, through MessageStoreHistory, by the LangChain memory,
+so every message is stored once
+"""
+import sys
+import time
+from uuid import uuid4
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Union, overload
+from langchain.schema.chat_history import BaseChatMessageHistory
+from langchain.schema.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from schema.stream_metrics import StreamMetrics
+
+
+class StoredMessage:
+    """
+    This class is used to store a message in the message log
+    It has the same attributes as schema.message.Message, the message id is a uuid4 hex
+    string like the id of a Message, so both share the keys of the render cache
+    """
+    __slots__ = ("message_id", "message", "message_type", "created_at", "metrics")
+
+    def __init__(self, message:str, message_type:str, created_at:Optional[float]=None,
+                 metrics:Optional[StreamMetrics]=None) -> None:
+        """
+        This is the constructor for the StoredMessage class
+
+        Args:
+            message: The message
+            message_type: The type of message, SYSTEM, USER or AI
+            created_at: The POSIX timestamp of the message, the current time if None
+            metrics: The latency metrics of the response
+        """
+        self.message_id = uuid4().hex
+        self.message = message
+        self.message_type = sys.intern(message_type)
+        self.created_at = time.time() if created_at is None else created_at
+        self.metrics = metrics
+
+
+    @property
+    def timestamp(self)->datetime:
+        """
+        This method is used to get the timestamp of the message
+
+        Returns:
+            The timestamp of the message
+        """
+        return datetime.fromtimestamp(self.created_at)
+
+
+class MessageStore(Sequence[StoredMessage]):
+    """
+    This class is used to store the messages of a conversation in order
+    """
+
+    def __init__(self) -> None:
+        """
+        This is the constructor for the MessageStore class
+        """
+        self._messages:List[StoredMessage] = []
+
+
+    @overload
+    def __getitem__(self, index:int)->StoredMessage: ...
+
+    @overload
+    def __getitem__(self, index:slice)->List[StoredMessage]: ...
+
+    def __getitem__(self, index:Union[int, slice])->Union[StoredMessage, List[StoredMessage]]:
+        return self._messages[index]
+
+
+    def __len__(self)->int:
+        return len(self._messages)
+
+
+    def __iter__(self)->Iterator[StoredMessage]:
+        return iter(self._messages)
+
+
+    def append(self, message:str, message_type:str, created_at:Optional[float]=None,
+               metrics:Optional[StreamMetrics]=None)->StoredMessage:
+        """
+        This method is used to add a message to the end of the log
+
+        Args:
+            message: The message
+            message_type: The type of message, SYSTEM, USER or AI
+            created_at: The POSIX timestamp of the message, the current time if None
+            metrics: The latency metrics of the response
+
+        Returns:
+            The stored message
+        """
+        stored_message = StoredMessage(message, message_type, created_at, metrics)
+        self._messages.append(stored_message)
+        return stored_message
+
+
+    def clear(self)->None:
+        """
+        This method is used to remove all the messages
+        """
+        self._messages.clear()
+
+
+_MESSAGE_CLASSES = {"USER": HumanMessage, "AI": AIMessage, "SYSTEM": SystemMessage}
+_MESSAGE_TYPES = {"human": "USER", "ai": "AI", "system": "SYSTEM"}
+
+
+def to_langchain_message(message:StoredMessage)->BaseMessage:
+    """
+    Converts a stored message to a LangChain message
+
+    Args:
+        message: The stored message
+
+    Returns:
+        The LangChain message
+    """
+    return _MESSAGE_CLASSES[message.message_type](content=message.message)
+
+
+class LangChainMessageView(Sequence[BaseMessage]):
+    """
+    This class is used to read the message store as LangChain messages
+    The messages are converted when they are accessed, so a memory which reads
+    the last messages only converts those
+    """
+
+    def __init__(self, store:MessageStore) -> None:
+        """
+        This is the constructor for the LangChainMessageView class
+
+        Args:
+            store: The message store
+        """
+        self.store = store
+
+
+    @overload
+    def __getitem__(self, index:int)->BaseMessage: ...
+
+    @overload
+    def __getitem__(self, index:slice)->List[BaseMessage]: ...
+
+    def __getitem__(self, index:Union[int, slice])->Union[BaseMessage, List[BaseMessage]]:
+        if isinstance(index, slice):
+            return [to_langchain_message(message) for message in self.store[index]]
+        return to_langchain_message(self.store[index])
+
+
+    def __len__(self)->int:
+        return len(self.store)
+
+
+class MessageStoreHistory(BaseChatMessageHistory):
+    """
+    This class is used by the LangChain memory to read and write the message store
+    """
+
+    def __init__(self, store:MessageStore) -> None:
+        """
+        This is the constructor for the MessageStoreHistory class
+
+        Args:
+            store: The message store
+        """
+        self.store = store
+
+
+    @property
+    def messages(self)->LangChainMessageView:
+        """
+        This method is used to get the messages of the store as LangChain messages
+
+        Returns:
+            The view of the messages
+        """
+        return LangChainMessageView(self.store)
+
+
+    def add_message(self, message:BaseMessage)->None:
+        """
+        This method is used to add a LangChain message to the store
+
+        Args:
+            message: The message to add
+        """
+        self.store.append(message.content, _MESSAGE_TYPES[message.type])
+
+
+    def clear(self)->None:
+        """
+        This method is used to remove all the messages of the store
+        """
+        self.store.clear()
@@ -3,8 +3,6 @@ This module contains the meta information for a model
 """
 from typing import Optional, Dict, Any, Union,Literal
 import os
-import sys
-from importlib.util import spec_from_file_location, module_from_spec
 from pydantic import Field, \
                         field_validator, \
                         model_validator, \
@@ -12,8 +10,7 @@ from pydantic import Field, \
                         AliasChoices
 from ui_elements.format_option import FormatOption
 from ui_elements.base_element import StreamLitPydanticModel
-from conversations.conversation import Conversation
-from models.base_model import BaseLLMModel
+from models.model_loader import inspect_model_class
 from schema.shared_state import get_shared_state
 
 
@@ -59,6 +56,12 @@ class ModelMetaInfo(StreamLitPydanticModel):
                                                         description=("The arguments for the"
                                                                      " chat memory module"),
                                                         default={})
+    stream_arguments: Dict[str, Any] = Field(validation_alias=
+                                                       AliasChoices('stream_arguments',
+                                                                    "StreamArguments"),
+                                                        description=("The arguments for"
+                                                                     " streaming the response"),
+                                                        default={})
     required_llm_arguments:Dict[str,
                                     Literal["STRING", "INT", "FLOAT",
                                             "BOOL",
@@ -79,28 +82,6 @@ class ModelMetaInfo(StreamLitPydanticModel):
                                    description="Whether the model is persistent",
                                    default=True)
 
-    _conversations:list[Conversation] = []
-
-
-    def add_conversation(self, conversation:Conversation)->None:
-        """
-        This method is used to add a conversation
-        
-        Args:
-            conversation: The conversation
-        """
-        self._conversations.append(conversation)
-
-
-    def get_conversations(self)->list[Conversation]:
-        """
-        This method is used to get the conversations
-        
-        Returns:
-            The conversations
-        """
-        return self._conversations
-
 
     def get_additional_custom_field_value(self, field_name:str)->Any:
         """
@@ -195,6 +176,9 @@ class ModelMetaInfo(StreamLitPydanticModel):
                     FormatOption(format_type="DICT",
                                  title=field_info["memory_arguments"]["description"],
                                  field_name="memory_arguments"),
+                    FormatOption(format_type="DICT",
+                                 title=field_info["stream_arguments"]["description"],
+                                 field_name="stream_arguments"),
                     FormatOption(format_type="BOOL",
                                  title=field_info["is_persistent"]["description"],
                                  field_name="is_persistent")
@@ -230,7 +214,10 @@ class ModelMetaInfo(StreamLitPydanticModel):
                                  field_name="llm_arguments"),
                     FormatOption(format_type="DICT",
                                  title=field_info["memory_arguments"]["description"],
-                                 field_name="memory_arguments")
+                                 field_name="memory_arguments"),
+                    FormatOption(format_type="DICT",
+                                 title=field_info["stream_arguments"]["description"],
+                                 field_name="stream_arguments")
                 ]
         return fields
 
@@ -334,17 +321,11 @@ class ModelMetaInfo(StreamLitPydanticModel):
         if os.path.isfile(llm_model_file) \
         and llm_model_file.endswith(".py") and model_class_key in data:
             class_name = data[model_class_key]
-            module_name = f"models.{data[model_file_key].split('.', 1)[0]}"
-            spec = spec_from_file_location(module_name,
-                                            llm_model_file)
-            module = module_from_spec(spec)
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
-            if hasattr(module, class_name) and \
-            issubclass(getattr(module, class_name), BaseLLMModel):
+            # The model file is only parsed here, it is imported when a conversation starts
+            if inspect_model_class(llm_model_file, class_name, data["base_dir"]):
                 data[model_file_key] = llm_model_file
                 return data
             raise ValueError((f"Class {data[model_class_key]} not found in model file"
-                                    " {llm_model_file} or is not derived from BaseLLMModel"))
+                                    f" {llm_model_file} or is not derived from BaseLLMModel"))
         raise ValueError((f"Model file {llm_model_file} not found or is not a python"
                             " file or doesn't have a corresponding model class"))
@@ -0,0 +1,247 @@
+"""
+This module is used to inspect and load the model classes from the model files
+"""
+import ast
+import hashlib
+import os
+import sys
+import inspect
+from dataclasses import dataclass, field
+from importlib.util import spec_from_file_location, module_from_spec
+from threading import RLock
+from types import ModuleType
+from typing import Optional, Type
+from models.base_model import BaseLLMModel
+
+
+BASE_MODEL_FILE = os.path.abspath(inspect.getsourcefile(BaseLLMModel))
+BASE_MODEL_CLASS = BaseLLMModel.__name__
+# The package under which the model files are imported, apart from the modules imported
+# with the import statement so that a model file never replaces one of them
+MODEL_MODULES_PACKAGE = "_chatverse_models"
+
+
+@dataclass
+class _ModelFileEntry:
+    """
+    This class is used to cache the state of a model file for one modification time
+    """
+    mtime_ns: int
+    inspected_classes: dict[tuple[str, str], bool] = field(default_factory=dict)
+    module: Optional[ModuleType] = None
+
+
+_MODEL_FILES:dict[str, _ModelFileEntry] = {}
+_MODEL_FILES_LOCK = RLock()
+
+
+def _get_entry(llm_model_file:str)->_ModelFileEntry:
+    """
+    Gets the cache entry of the model file, a new entry is created when the file changed
+    Must be called with the model files lock held
+
+    Args:
+        llm_model_file: The absolute path to the model file
+
+    Returns:
+        The cache entry of the model file
+    """
+    mtime_ns = os.stat(llm_model_file).st_mtime_ns
+    entry = _MODEL_FILES.get(llm_model_file)
+    if entry is None or entry.mtime_ns != mtime_ns:
+        entry = _ModelFileEntry(mtime_ns=mtime_ns)
+        _MODEL_FILES[llm_model_file] = entry
+    return entry
+
+
+def _parse_module(module_file:str)->ast.Module:
+    """
+    Parses the python file without executing it
+
+    Args:
+        module_file: The path to the python file
+
+    Returns:
+        The parsed module
+    """
+    with open(module_file, encoding="utf-8") as file_handler:
+        return ast.parse(file_handler.read(), filename=module_file)
+
+
+def _resolve_module_file(module_name:str, level:int, module_file:str,
+                         search_path:str)->Optional[str]:
+    """
+    Resolves the file of an imported module
+
+    Args:
+        module_name: The name of the imported module
+        level: The level of the relative import
+        module_file: The file which imports the module
+        search_path: The directory from which absolute imports are resolved
+
+    Returns:
+        The path to the module file if found else None
+    """
+    if level > 0:
+        root = os.path.dirname(module_file)
+        for _ in range(level - 1):
+            root = os.path.dirname(root)
+    else:
+        root = search_path
+    parts = module_name.split(".") if module_name else []
+    candidate = os.path.join(root, *parts)
+    if os.path.isfile(candidate + ".py"):
+        return candidate + ".py"
+    if os.path.isfile(os.path.join(candidate, "__init__.py")):
+        return os.path.join(candidate, "__init__.py")
+    return None
+
+
+def _is_model_class(module_file:str, class_name:str, search_path:str,
+                    visited:set[tuple[str, str]])->bool:
+    """
+    Checks whether the class defined in the module file derives from BaseLLMModel
+
+    Args:
+        module_file: The path to the python file
+        class_name: The name of the class
+        search_path: The directory from which absolute imports are resolved
+        visited: The classes which are already checked
+
+    Returns:
+        True if the class derives from BaseLLMModel else False
+    """
+    module_file = os.path.abspath(module_file)
+    if module_file == BASE_MODEL_FILE and class_name == BASE_MODEL_CLASS:
+        return True
+    if (module_file, class_name) in visited:
+        return False
+    visited.add((module_file, class_name))
+    module = _parse_module(module_file)
+    imported_names:dict[str, tuple[Optional[str], str, int]] = {}
+    imported_modules:dict[str, str] = {}
+    class_node = None
+    for node in module.body:
+        if isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                imported_names[alias.asname or alias.name] = (node.module, alias.name, node.level)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imported_modules[alias.asname] = alias.name
+                else:
+                    imported_modules[alias.name.split(".", 1)[0]] = alias.name.split(".", 1)[0]
+        elif isinstance(node, ast.ClassDef) and node.name == class_name:
+            class_node = node
+    if class_node is None:
+        return False
+    for base in class_node.bases:
+        if isinstance(base, ast.Name):
+            if base.id in imported_names:
+                base_module, base_class, level = imported_names[base.id]
+                base_file = _resolve_module_file(base_module, level, module_file, search_path)
+            else:
+                base_class = base.id
+                base_file = module_file
+        elif isinstance(base, ast.Attribute):
+            prefix = ast.unparse(base.value)
+            first, _, rest = prefix.partition(".")
+            if first not in imported_modules:
+                continue
+            base_module = ".".join(filter(None, [imported_modules[first], rest]))
+            base_class = base.attr
+            base_file = _resolve_module_file(base_module, 0, module_file, search_path)
+        else:
+            continue
+        if base_file is not None and \
+           _is_model_class(base_file, base_class, search_path, visited):
+            return True
+    return False
+
+
+def inspect_model_class(llm_model_file:str, class_name:str, search_path:str)->bool:
+    """
+    Checks that the model file defines the model class and that it derives from
+    BaseLLMModel without executing the model file
+
+    Args:
+        llm_model_file: The path to the model file
+        class_name: The name of the model class
+        search_path: The directory from which absolute imports are resolved
+
+    Returns:
+        True if the model class is valid else False
+    """
+    llm_model_file = os.path.abspath(llm_model_file)
+    try:
+        with _MODEL_FILES_LOCK:
+            entry = _get_entry(llm_model_file)
+            if entry.module is not None:
+                model_class = getattr(entry.module, class_name, None)
+                return isinstance(model_class, type) and issubclass(model_class, BaseLLMModel)
+            cache_key = (class_name, os.path.abspath(search_path))
+            if cache_key not in entry.inspected_classes:
+                entry.inspected_classes[cache_key] = _is_model_class(llm_model_file, class_name,
+                                                                     search_path, set())
+            return entry.inspected_classes[cache_key]
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return False
+
+
+def get_module_name(llm_model_file:str, mtime_ns:int)->str:
+    """
+    Gets the private module name used to import the model file
+    The name is unique per file and modification time, so model files with the same name
+    in different directories do not replace each other and a reloaded file does not
+    replace the module of the classes which are still used by the earlier conversations
+
+    Args:
+        llm_model_file: The path to the model file
+        mtime_ns: The modification time of the model file in nanoseconds
+
+    Returns:
+        The module name
+    """
+    llm_model_file = os.path.abspath(llm_model_file)
+    file_hash = hashlib.sha1(llm_model_file.encode("utf-8")).hexdigest()[:12]
+    module_stem = os.path.basename(llm_model_file).split('.', 1)[0]
+    return f"{MODEL_MODULES_PACKAGE}.{module_stem}_{file_hash}_{mtime_ns}"
+
+
+def load_model_class(llm_model_file:str, class_name:str)->Type[BaseLLMModel]:
+    """
+    Imports the model file and returns the model class
+    The model file is imported once per modification time, so every conversation
+    shares the same module and a changed file is reloaded on the next call as a new module,
+    the conversations started before keep the class of the earlier module.
+
+    Args:
+        llm_model_file: The path to the model file
+        class_name: The name of the model class
+
+    Returns:
+        The model class
+
+    Raises:
+        ValueError: If the class is not found or is not derived from BaseLLMModel
+    """
+    llm_model_file = os.path.abspath(llm_model_file)
+    with _MODEL_FILES_LOCK:
+        entry = _get_entry(llm_model_file)
+        if entry.module is None:
+            module_name = get_module_name(llm_model_file, entry.mtime_ns)
+            spec = spec_from_file_location(module_name, llm_model_file)
+            module = module_from_spec(spec)
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                sys.modules.pop(module_name, None)
+                raise
+            entry.module = module
+        module = entry.module
+    model_class = getattr(module, class_name, None)
+    if not isinstance(model_class, type) or not issubclass(model_class, BaseLLMModel):
+        raise ValueError((f"Class {class_name} not found in model file"
+                          f" {llm_model_file} or is not derived from BaseLLMModel"))
+    return model_class
@@ -0,0 +1,101 @@
+"""
+This module implements a chat memory which keeps the last turns and a summary of the older ones
+"""
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+from langchain.chains import LLMChain
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.summary import SummarizerMixin
+from langchain.schema.messages import BaseMessage, get_buffer_string
+from models.llama_cache import separate_context
+from utils.async_runner import submit
+
+
+class RollingSummaryMemory(BaseChatMemory, SummarizerMixin):
+    """
+    This class is used to give the LLM the last k turns and a running summary of the older turns
+    The turns which leave the window are summarized on the process wide event loop
+    after the chain has returned, so the summary never delays a response.
+    The turns which are not summarized yet are given as they are.
+    """
+    k: int = 5
+    memory_key: str = "history"
+    summary: str = ""
+    summarized_index: int = 0
+    summary_future: Optional[Future] = None
+
+
+    @property
+    def memory_variables(self) -> List[str]:
+        """
+        This method is used to get the keys this memory adds to the inputs of the chain
+
+        Returns:
+            The memory keys
+        """
+        return [self.memory_key]
+
+
+    def load_memory_variables(self, inputs:Dict[str, Any])->Dict[str, Any]:
+        """
+        This method is used to get the summary and the turns which are not summarized
+
+        Args:
+            inputs: The inputs of the chain
+
+        Returns:
+            The history under the memory key
+        """
+        messages:List[BaseMessage] = self.chat_memory.messages[self.summarized_index:]
+        if self.summary:
+            messages = [self.summary_message_cls(content=self.summary)] + messages
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix,
+                                                   ai_prefix=self.ai_prefix)}
+
+
+    def save_context(self, inputs:Dict[str, Any], outputs:Dict[str, str])->None:
+        """
+        This method is used to save the turn and summarize the turns which left the window
+
+        Args:
+            inputs: The inputs of the chain
+            outputs: The outputs of the chain
+        """
+        super().save_context(inputs, outputs)
+        window_start = len(self.chat_memory.messages) - self.k * 2
+        if window_start > self.summarized_index and \
+           (self.summary_future is None or self.summary_future.done()):
+            self.summary_future = submit(self.asummarize(window_start))
+
+
+    async def asummarize(self, end:int)->None:
+        """
+        This method is used to add the turns up to end to the summary
+        If the LLM fails the summary is not changed and the turns are summarized
+        with the next turn.
+        The summary is run outside the evaluated context of the conversation
+        so the next turn does not evaluate the whole prompt again
+
+        Args:
+            end: The index of the first message which is not summarized
+        """
+        new_lines = get_buffer_string(self.chat_memory.messages[self.summarized_index:end],
+                                      human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)
+        with separate_context(self.llm) as llm:
+            chain = LLMChain(llm=llm, prompt=self.prompt)
+            summary = await chain.apredict(summary=self.summary, new_lines=new_lines)
+        self.summary, self.summarized_index = summary.strip(), end
+
+
+    def clear(self)->None:
+        """
+        This method is used to clear the history and the summary
+        """
+        if self.summary_future is not None:
+            self.summary_future.cancel()
+            self.summary_future = None
+        super().clear()
+        self.summary = ""
+        self.summarized_index = 0
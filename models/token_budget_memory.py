@@ -0,0 +1,156 @@
+"""
+This module implements a chat memory which keeps as much history as fits in a token budget
+"""
+from typing import Any, Dict, List
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.utils import get_prompt_input_key
+from langchain.pydantic_v1 import Field
+from langchain.schema.language_model import BaseLanguageModel
+from langchain.schema.messages import BaseMessage, get_buffer_string
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """
+    This class is used to give the LLM the most recent messages which fit in max_token_limit
+    The token count of a message is computed once when it is saved, so a turn only
+    counts the new messages and the question. The messages which can never fit
+    in the budget again are skipped, the history itself is not modified since
+    it may be shared with the renderer.
+    """
+    llm: BaseLanguageModel
+    max_token_limit: int
+    tokens_per_message: int = 4
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    memory_key: str = "history"
+    token_counts: List[int] = Field(default_factory=list)
+    total_tokens: int = 0
+    start_index: int = 0
+
+
+    @property
+    def memory_variables(self) -> List[str]:
+        """
+        This method is used to get the keys this memory adds to the inputs of the chain
+
+        Returns:
+            The memory keys
+        """
+        return [self.memory_key]
+
+
+    def count_tokens(self, text:str)->int:
+        """
+        This method is used to count the tokens of a text with the tokenizer of the LLM
+
+        Args:
+            text: The text to count the tokens of
+
+        Returns:
+            The number of tokens including the per message overhead
+        """
+        return self.llm.get_num_tokens(text) + self.tokens_per_message
+
+
+    def count_message_tokens(self, message:BaseMessage)->int:
+        """
+        This method is used to count the tokens of a message in the history
+
+        Args:
+            message: The message
+
+        Returns:
+            The number of tokens of the message
+        """
+        return self.count_tokens(get_buffer_string([message], human_prefix=self.human_prefix,
+                                                   ai_prefix=self.ai_prefix))
+
+
+    def update_token_counts(self)->None:
+        """
+        This method is used to count the tokens of the messages added since the last call
+        """
+        for message in self.chat_memory.messages[self.start_index + len(self.token_counts):]:
+            count = self.count_message_tokens(message)
+            self.token_counts.append(count)
+            self.total_tokens += count
+
+
+    def prune(self)->List[BaseMessage]:
+        """
+        This method is used to skip the oldest messages which are over the budget
+
+        Returns:
+            The skipped messages
+        """
+        self.update_token_counts()
+        pruned = 0
+        while self.total_tokens > self.max_token_limit and pruned < len(self.token_counts):
+            self.total_tokens -= self.token_counts[pruned]
+            pruned += 1
+        pruned_messages = self.chat_memory.messages[self.start_index:self.start_index + pruned]
+        self.start_index += pruned
+        del self.token_counts[:pruned]
+        return pruned_messages
+
+
+    def get_recent_messages(self, budget:int)->List[BaseMessage]:
+        """
+        This method is used to get the most recent messages which fit in the budget
+
+        Args:
+            budget: The number of tokens available for the history
+
+        Returns:
+            The messages in the order of the conversation
+        """
+        self.update_token_counts()
+        used = 0
+        start = len(self.token_counts)
+        while start > 0 and used + self.token_counts[start - 1] <= budget:
+            start -= 1
+            used += self.token_counts[start]
+        return self.chat_memory.messages[self.start_index + start:]
+
+
+    def load_memory_variables(self, inputs:Dict[str, Any])->Dict[str, Any]:
+        """
+        This method is used to get the history which fits in the budget with the question
+
+        Args:
+            inputs: The inputs of the chain
+
+        Returns:
+            The history under the memory key
+        """
+        budget = self.max_token_limit
+        if inputs:
+            input_key = self.input_key or get_prompt_input_key(inputs, self.memory_variables)
+            budget -= self.count_tokens(str(inputs[input_key]))
+        messages = self.get_recent_messages(budget)
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix,
+                                                   ai_prefix=self.ai_prefix)}
+
+
+    def save_context(self, inputs:Dict[str, Any], outputs:Dict[str, str])->None:
+        """
+        This method is used to save the turn and prune the history
+
+        Args:
+            inputs: The inputs of the chain
+            outputs: The outputs of the chain
+        """
+        super().save_context(inputs, outputs)
+        self.prune()
+
+
+    def clear(self)->None:
+        """
+        This method is used to clear the history
+        """
+        super().clear()
+        self.token_counts.clear()
+        self.total_tokens = 0
+        self.start_index = 0
@@ -3,10 +3,11 @@ This module is the streamlit app for the AI ChatVerse
 """
 import os
 import streamlit as st
-from app_utils import load_models, on_new_user_messaage, \
-                      get_current_conversation, load_conversations, \
+from app_utils import load_config_registry, load_models, load_summarizer, \
+                      on_new_user_messaage, \
+                      get_current_conversation, load_conversation_registry, \
                       render_conversation, \
-                      render_sidebar, render_model_description, \
+                      render_sidebar, render_required_fields, render_model_description, \
                       set_page_config
 
 
@@ -20,7 +21,8 @@ def render(config_file:str, app_home:str):
     """
     # Set the APP name and the favicon
     set_page_config()
-    models = load_models(config_file, app_home)
+    config_registry = load_config_registry(config_file, app_home)
+    models = load_models(config_registry)
     # Have all the model names for the select box
     model_names = []
     name_key_reverse_map = {}
@@ -28,18 +30,21 @@ def render(config_file:str, app_home:str):
         model_names.append(model.name)
         name_key_reverse_map[model.name] = key
     current_conversation = get_current_conversation()
-    all_conversations = load_conversations()
+    conversation_registry = load_conversation_registry()
     model = st.selectbox("Select Model", model_names, 
                      disabled=current_conversation is not None,
                      index=model_names.index(models[current_conversation.key].name) \
                         if current_conversation else 0)
     model_used_by_user = models[name_key_reverse_map[model]]
     render_model_description(current_conversation, model_used_by_user)
-    model_used_by_user.render_sidebar()
-    render_sidebar(current_conversation, all_conversations)
+    # The sidebar regions and the conversation are rerun on their own when they are used
+    with st.sidebar:
+        render_required_fields(model_used_by_user)
+        render_sidebar(current_conversation, conversation_registry)
     st.chat_input("Ask something to " + model, key="chat_input",
                   kwargs={"current_conversation" : current_conversation,
-                          "model_used_by_user" : model_used_by_user},
+                          "model_used_by_user" : model_used_by_user,
+                          "summarizer" : load_summarizer(config_registry)},
                   on_submit=on_new_user_messaage)
     render_conversation(current_conversation, model_used_by_user)
 
@@ -6,14 +6,18 @@ import streamlit as st
 from models.meta_info import ModelMetaInfo
 from conversations.conversation import Conversation
 from app_utils import render_models_view,\
+                      cancel_pending_response,\
                       state_of_model,\
                       cancel_model_focus_mode,\
                       render_model_view, \
                       render_model_create, \
                       load_models, \
+                      load_config_registry, \
                       get_selected_model, \
                       is_model_locked, \
-                      render_model_edit \
+                      render_model_edit, \
+                      get_current_conversation, \
+                      load_conversation_registry \
                         ,set_page_config
 
 
@@ -23,16 +27,9 @@ def delete_conversation(conversation:Conversation):
     Args:
         conversation (Conversation): The conversation to delete
     """
-    conversations = st.session_state['conversations']
-    index = 0
-    while index < len(conversations):
-        if conversations[index] == conversation:
-            del conversations[index]
-        else:
-            index += 1
-    if conversation == st.session_state['current_conversation']:
+    load_conversation_registry().remove(conversation)
+    if conversation is get_current_conversation():
         st.session_state['current_conversation'] = None
-    st.session_state['conversations'] = conversations
 
 
 def delete_model(model_meta_info:ModelMetaInfo):
@@ -47,9 +44,11 @@ def delete_model(model_meta_info:ModelMetaInfo):
     for model_key, meta_info in models.items():
         if meta_info == model_meta_info:
             model_key_to_delete = model_key
-            for conversation in meta_info.get_conversations():
-                delete_conversation(conversation)
     if model_key_to_delete:
+        load_conversation_registry().remove_model_conversations(model_key_to_delete)
+        current_conversation = get_current_conversation()
+        if current_conversation is not None and current_conversation.key == model_key_to_delete:
+            st.session_state['current_conversation'] = None
         del models[model_key_to_delete]
     st.session_state['models'] = models
     cancel_model_focus_mode()
@@ -64,10 +63,13 @@ def render(config_file:str, app_home:str):
         app_home (str): The path to the app home directory
     """
     set_page_config()
+    # The chat page is not shown so its response would not be read
+    cancel_pending_response()
     st.header("✏️ Edit and Create LLM Model 🤖")
+    config_registry = load_config_registry(config_file, app_home)
     model_state = state_of_model()
     if model_state != "view":
-        models = list(load_models(config_file, app_home).values())
+        models = list(load_models(config_registry).values())
         model_meta_info = get_selected_model(models)
         if model_state == "model_view":
             render_model_view(model_meta_info)
@@ -86,11 +88,13 @@ def render(config_file:str, app_home:str):
             render_model_edit(model_meta_info)
         elif model_state == "model_delete":
             st.info("Are you sure you want to delete this model?")
-            if model_meta_info.get_conversations():
+            model_conversations = load_conversation_registry().get_conversations(
+                                                                        model_meta_info.key)
+            if model_conversations:
                 st.warning(("This model has conversations associated with it. "
                             "Deleting this model will delete all the conversations associated"
                             " with it."))
-                for conversation in model_meta_info.get_conversations():
+                for conversation in model_conversations:
                     st.info(conversation.conversation_topic)
             lef_col, right_col = st.columns([10, 2])
             with lef_col:
@@ -99,7 +103,7 @@ def render(config_file:str, app_home:str):
             with right_col:
                 st.button("🗑️", key="delete_model", on_click=delete_model, args=(model_meta_info,))
     else:
-        render_models_view(config_file, app_home)
+        render_models_view(config_registry)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,16 @@
 """
 This module is used to define the config file schema
 """
-from typing import Any, Dict
+import os
+from hashlib import sha256
+from threading import Lock
+from typing import Any, Dict, NamedTuple, Optional
 import yaml
-from pydantic import BaseModel, Field, model_validator, field_validator
+from pydantic import BaseModel, Field, model_validator
 from models.meta_info import ModelMetaInfo
 from schema.group_agent import GroupAgent
 from schema.shared_state import get_shared_state
+from schema.summarizer_setting import EXTRACTIVE_SUMMARIZER, SummarizerSetting
 from utils.util import clear_default_values, get_field_name
 
 
@@ -23,23 +27,39 @@ class ConfigFile(BaseModel):
                                                     description="The group chat agents")
     shared_state:Dict[str, Any] = Field(validation_alias="SharedState",
                                         description="The shared state", default_factory=dict)
+    summarizer_model:SummarizerSetting = Field(validation_alias="SummarizerModel",
+                                               description="The setting of the summarizer",
+                                               default_factory=SummarizerSetting)
 
 
-    @field_validator("shared_state")
-    @classmethod
-    def validate_shared_state(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+    def apply_shared_state(self)->None:
+        """
+        This method is used to copy the shared state of the config file
+        to the shared state of the current session
+        """
+        SHARED_CONFIG = get_shared_state()
+        SHARED_CONFIG.update(**self.shared_state)
+
+
+    def get_session_models(self)->Dict[str, ModelMetaInfo]:
         """
-        This method is used to validate the shared state
+        This method is used to get a copy of the models which a session can modify
         
-        Args:
-            data: The data
+        Returns:
+            The models with key as the model identifier
+        """
+        return {key: model.model_copy(deep=True) for key, model in self.models.items()}
+
+
+    def get_session_group_agents(self)->Dict[str, GroupAgent]:
+        """
+        This method is used to get a copy of the group agents which a session can modify
         
         Returns:
-            The data
+            The group agents with key as the group agent identifier
         """
-        SHARED_CONFIG = get_shared_state()
-        SHARED_CONFIG.update(**data)
-        return data
+        return {key: group_agent.model_copy(deep=True)
+                for key, group_agent in self.group_chat_agents.items()}
 
 
     @model_validator(mode='before')
@@ -120,6 +140,9 @@ class ConfigFile(BaseModel):
             model = ModelMetaInfo(**dict_model)
             models_already_validated[model_key] = model
         self.models = models_already_validated
+        summarizer = self.summarizer_model.model
+        if summarizer not in (None, EXTRACTIVE_SUMMARIZER) and summarizer not in self.models:
+            raise ValueError(f"Summarizer model {summarizer} not found in models")
         return self
 
 
@@ -138,3 +161,78 @@ def pydantic_validate_config(config_file:str, base_path:str)->ConfigFile:
         except yaml.YAMLError as exc:
             raise exc
     return ConfigFile(base_dir=base_path, **config)
+
+
+class ConfigFingerprint(NamedTuple):
+    """
+    This class is used to identify a version of the config file on disk
+    """
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+class _CachedConfig(NamedTuple):
+    """
+    This class is used to store a validated config file with its fingerprint
+    """
+    fingerprint: ConfigFingerprint
+    config: ConfigFile
+
+
+_CONFIG_CACHE:Dict[tuple[str, str], _CachedConfig] = {}
+_CONFIG_CACHE_LOCK = Lock()
+
+
+def _cached_config_is_fresh(cached:Optional[_CachedConfig], stat:os.stat_result)->bool:
+    """
+    Checks whether the cached config file matches the file on disk without reading it
+    
+    Args:
+        cached: The cached config file
+        stat: The stat result of the config file
+    Returns:
+        True if the modification time and size are unchanged
+    """
+    return cached is not None and \
+        cached.fingerprint.mtime_ns == stat.st_mtime_ns and \
+        cached.fingerprint.size == stat.st_size
+
+
+def get_validated_config(config_file:str, base_path:str)->ConfigFile:
+    """
+    Gets the validated config file from a process wide cache
+    The config file is validated once per version of the file on disk and the
+    same snapshot is handed to every session, so it must be treated as read-only.
+    Use ``ConfigFile.get_session_models`` and ``ConfigFile.get_session_group_agents``
+    to get copies that a session can modify.
+    The cache is invalidated when the modification time or content of the file changes.
+
+    Args:
+        config_file: The path to the config file
+        base_path: The base path of the app
+    Returns:
+        The validated config file
+    """
+    cache_key = (os.path.abspath(config_file), os.path.abspath(base_path))
+    stat = os.stat(config_file)
+    cached = _CONFIG_CACHE.get(cache_key)
+    if _cached_config_is_fresh(cached, stat):
+        return cached.config
+    with _CONFIG_CACHE_LOCK:
+        cached = _CONFIG_CACHE.get(cache_key)
+        stat = os.stat(config_file)
+        if _cached_config_is_fresh(cached, stat):
+            return cached.config
+        with open(config_file, "rb") as file_handler:
+            content = file_handler.read()
+        fingerprint = ConfigFingerprint(mtime_ns=stat.st_mtime_ns, size=len(content),
+                                        digest=sha256(content).hexdigest())
+        if cached is not None and cached.fingerprint.digest == fingerprint.digest:
+            # The file was touched but not changed
+            _CONFIG_CACHE[cache_key] = _CachedConfig(fingerprint, cached.config)
+            return cached.config
+        config = yaml.safe_load(content.decode("utf-8"))
+        validated_config = ConfigFile(base_dir=base_path, **config)
+        _CONFIG_CACHE[cache_key] = _CachedConfig(fingerprint, validated_config)
+        return validated_config
@@ -3,7 +3,6 @@ from typing import Any
 from pydantic import BaseModel, Field, model_validator
 from ui_elements.group_setting import MetaGPTSetting
 from utils.util import get_field_name
-from backend.metagpt import run_metagpt
 
 class GroupAgentCharacter(BaseModel):
     """
@@ -65,6 +64,8 @@ class GroupAgent(BaseModel):
         Args:
             idea: The idea
         """
+        # MetaGPT is imported when a group chat runs, not when the config is loaded
+        from backend.metagpt import run_metagpt # pylint: disable=import-outside-toplevel
         run_metagpt(self.setting, self.characters, idea)
         
 
@@ -2,8 +2,10 @@
 This is the schema for a group message
 """
 from datetime import datetime
-from typing import Literal
+from uuid import uuid4
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
+from schema.stream_metrics import StreamMetrics
 
 
 class GroupMessage(BaseModel):
@@ -16,4 +18,7 @@ class GroupMessage(BaseModel):
     timestamp: datetime = Field(description="The timestamp of the message",
                                 default_factory=datetime.now)
     message_type: Literal['AI', 'USER'] = Field(description="The type of the message")
-
+    metrics: Optional[StreamMetrics] = Field(description="The latency metrics of the message",
+                                             default=None)
+    message_id: str = Field(description="The stable id of the message",
+                            default_factory=lambda: uuid4().hex)
@@ -2,8 +2,10 @@
 This is the module for the message data class
 """
 from datetime import datetime
-from typing import Literal
+from uuid import uuid4
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
+from schema.stream_metrics import StreamMetrics
 
 
 class Message(BaseModel):
@@ -14,3 +16,7 @@ class Message(BaseModel):
     message_type: Literal['SYSTEM', 'USER', 'AI'] = Field(description="The type of message")
     timestamp: datetime = Field(description="The timestamp of the message",
                                 default_factory=datetime.now)
+    metrics: Optional[StreamMetrics] = Field(description="The latency metrics of the response",
+                                             default=None)
+    message_id: str = Field(description="The stable id of the message",
+                            default_factory=lambda: uuid4().hex)
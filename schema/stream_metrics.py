@@ -0,0 +1,122 @@
+"""
+This is the module for the latency metrics of a streamed response
+"""
+import math
+import time
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class StreamMetrics(BaseModel):
+    """
+    This is the class for the latency metrics of a streamed response
+    """
+    time_to_first_token: Optional[float] = Field(description=("The seconds from the request"
+                                                               " to the first token"),
+                                                  default=None)
+    token_count: int = Field(description="The number of streamed tokens", default=0)
+    duration: float = Field(description="The seconds from the request to the end", default=0.0)
+    tokens_per_second: Optional[float] = Field(description=("The tokens per second after the"
+                                                             " first token"), default=None)
+    inter_token_p50: Optional[float] = Field(description=("The median seconds between"
+                                                           " two tokens"), default=None)
+    inter_token_p90: Optional[float] = Field(description=("The 90th percentile of the seconds"
+                                                           " between two tokens"), default=None)
+    inter_token_p99: Optional[float] = Field(description=("The 99th percentile of the seconds"
+                                                           " between two tokens"), default=None)
+
+
+    def summary(self)->str:
+        """
+        This method is used to get a short text describing the metrics
+
+        Returns:
+            The summary of the metrics
+        """
+        parts = []
+        if self.time_to_first_token is not None:
+            parts.append(f"⚡ {self.time_to_first_token:0.2f}s to first token")
+        if self.tokens_per_second is not None:
+            parts.append(f"{self.tokens_per_second:0.1f} tokens/s")
+        if self.inter_token_p50 is not None:
+            parts.append(f"p50 {self.inter_token_p50 * 1000:0.0f}ms"
+                         f" p90 {self.inter_token_p90 * 1000:0.0f}ms")
+        return " · ".join(parts)
+
+
+def _percentile(sorted_values:list[float], percentile:float)->float:
+    """
+    Gets the nearest rank percentile of the sorted values
+
+    Args:
+        sorted_values: The values in ascending order
+        percentile: The percentile between 0 and 100
+
+    Returns:
+        The percentile of the values
+    """
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class StreamMetricsRecorder:
+    """
+    This class is used to record the timings of a streamed response
+    """
+
+    def __init__(self) -> None:
+        """
+        This is the constructor for the StreamMetricsRecorder class
+        """
+        self.request_start = time.perf_counter()
+        self.token_times:list[float] = []
+        self.end:Optional[float] = None
+
+
+    def start(self)->None:
+        """
+        This method is used to record the start of the request
+        """
+        self.request_start = time.perf_counter()
+        self.token_times = []
+        self.end = None
+
+
+    def record_token(self)->None:
+        """
+        This method is used to record that a token was received
+        """
+        self.token_times.append(time.perf_counter())
+
+
+    def stop(self)->None:
+        """
+        This method is used to record the end of the response
+        """
+        self.end = time.perf_counter()
+
+
+    def get_metrics(self)->StreamMetrics:
+        """
+        This method is used to compute the metrics from the recorded timings
+
+        Returns:
+            The metrics of the response
+        """
+        end = self.end if self.end is not None else time.perf_counter()
+        metrics = StreamMetrics(token_count=len(self.token_times),
+                                duration=end - self.request_start)
+        if not self.token_times:
+            return metrics
+        first_token = self.token_times[0]
+        metrics.time_to_first_token = first_token - self.request_start
+        if len(self.token_times) > 1:
+            gaps = sorted(later - earlier for earlier, later in
+                          zip(self.token_times, self.token_times[1:]))
+            metrics.inter_token_p50 = _percentile(gaps, 50)
+            metrics.inter_token_p90 = _percentile(gaps, 90)
+            metrics.inter_token_p99 = _percentile(gaps, 99)
+            generation_time = self.token_times[-1] - first_token
+            if generation_time > 0:
+                metrics.tokens_per_second = (len(self.token_times) - 1) / generation_time
+        return metrics
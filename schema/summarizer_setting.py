@@ -0,0 +1,25 @@
+"""
+This is the schema for the setting of the conversation summarizer
+"""
+from typing import Optional
+from pydantic import AliasChoices, BaseModel, Field
+
+EXTRACTIVE_SUMMARIZER = "extractive"
+
+
+class SummarizerSetting(BaseModel):
+    """
+    This class is used to store the setting of the model which summarizes the conversations
+    """
+    model: Optional[str] = Field(validation_alias=AliasChoices('model', "Model"),
+                                 description=("The key of the model which summarizes the"
+                                              " conversations, extractive to use the first"
+                                              " words of the conversation or None to use"
+                                              " the model of the conversation"),
+                                 default=None)
+    max_tokens: int = Field(validation_alias=AliasChoices('max_tokens', "MaxTokens"),
+                            description="The maximum number of tokens of a summary",
+                            default=16, gt=0)
+    cache_size: int = Field(validation_alias=AliasChoices('cache_size', "CacheSize"),
+                            description="The number of summaries which are cached",
+                            default=256, ge=0)
@@ -0,0 +1,157 @@
+"""
+This module implements a local stand-in for the OpenAI chat completions API
+It answers every request with a fixed response, streamed when the request asks for it,
+and records the client port of every request so the reuse of connections can be checked
+"""
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+RESPONSE = "Hello from the stand-in server"
+
+
+class OpenAIStandIn:
+    """
+    This class is used to run the stand-in server on the running event loop
+    """
+
+    def __init__(self, use_tls:bool=False) -> None:
+        """
+        This is the constructor for the OpenAIStandIn class
+
+        Args:
+            use_tls: Whether the server uses TLS with a self signed certificate
+        """
+        self.use_tls = use_tls
+        self.client_ports:List[int] = []
+        self.certificate_file:Optional[str] = None
+        self._server:Optional[TestServer] = None
+        self._directory:Optional[tempfile.TemporaryDirectory] = None
+
+
+    @property
+    def base_url(self)->str:
+        """
+        This method is used to get the base URL to give to the OpenAI client
+
+        Returns:
+            The base URL of the API
+        """
+        scheme = "https" if self.use_tls else "http"
+        return f"{scheme}://{self._server.host}:{self._server.port}/v1"
+
+
+    @property
+    def connection_count(self)->int:
+        """
+        This method is used to get the number of connections the requests were sent on
+
+        Returns:
+            The number of distinct client connections
+        """
+        return len(set(self.client_ports))
+
+
+    async def start(self)->None:
+        """
+        This method is used to start the server
+        """
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        ssl_context = None
+        if self.use_tls:
+            ssl_context = self._create_ssl_context()
+        self._server = TestServer(app, host="127.0.0.1")
+        await self._server.start_server(ssl=ssl_context)
+
+
+    async def close(self)->None:
+        """
+        This method is used to stop the server
+        """
+        await self._server.close()
+        if self._directory is not None:
+            self._directory.cleanup()
+
+
+    async def chat_completions(self, request:web.Request)->web.StreamResponse:
+        """
+        This method is used to answer a chat completion request
+
+        Args:
+            request: The request
+
+        Returns:
+            The completion, as server sent events if the request is streamed
+        """
+        self.client_ports.append(request.transport.get_extra_info("peername")[1])
+        body = await request.json()
+        completion = {"id": "chatcmpl-stand-in", "created": int(time.time()),
+                      "model": body.get("model", "gpt-3.5-turbo")}
+        if not body.get("stream"):
+            return web.json_response({**completion, "object": "chat.completion",
+                                      "choices": [{"index": 0, "finish_reason": "stop",
+                                                   "message": {"role": "assistant",
+                                                               "content": RESPONSE}}],
+                                      "usage": {"prompt_tokens": 1, "completion_tokens": 1,
+                                                "total_tokens": 2}})
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in RESPONSE.split(" "):
+            chunk = {**completion, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "finish_reason": None,
+                                  "delta": {"content": token + " "}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+    @contextmanager
+    def trusted_certificate(self)->Iterator[None]:
+        """
+        This method is used to make the clients trust the certificate of the server
+        through the SSL_CERT_FILE environment variable, which is restored on exit
+        """
+        previous_certificate_file = os.environ.get("SSL_CERT_FILE")
+        os.environ["SSL_CERT_FILE"] = self.certificate_file
+        try:
+            yield
+        finally:
+            if previous_certificate_file is None:
+                os.environ.pop("SSL_CERT_FILE", None)
+            else:
+                os.environ["SSL_CERT_FILE"] = previous_certificate_file
+
+
+    def _create_ssl_context(self)->ssl.SSLContext:
+        """
+        This method is used to create a self signed certificate for 127.0.0.1
+        The clients trust it inside trusted_certificate
+
+        Returns:
+            The SSL context of the server
+
+        Raises:
+            RuntimeError: If openssl is not installed
+        """
+        if shutil.which("openssl") is None:
+            raise RuntimeError("openssl is required to run the stand-in server with TLS")
+        self._directory = tempfile.TemporaryDirectory()
+        self.certificate_file = os.path.join(self._directory.name, "certificate.pem")
+        key_file = os.path.join(self._directory.name, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                        "-keyout", key_file, "-out", self.certificate_file, "-days", "1",
+                        "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+                       check=True, capture_output=True)
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(self.certificate_file, key_file)
+        return ssl_context
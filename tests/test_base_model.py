@@ -0,0 +1,45 @@
+"""
+Tests of the base model on the process wide event loop
+"""
+import asyncio
+import time
+from models.base_model import BaseLLMModel, FakeLLM
+from utils.async_runner import run_sync
+
+DELAY = 0.3
+
+
+class SlowLLM(FakeLLM):
+    """
+    Fake LLM which blocks its thread while it generates the response
+    """
+
+    def give_response_to_prompt(self, messages, system_prompt):
+        time.sleep(DELAY)
+        return super().give_response_to_prompt(messages, system_prompt)
+
+
+def create_model()->BaseLLMModel:
+    """
+    Creates a base model with the slow LLM
+    """
+    model = BaseLLMModel()
+    model.llm = SlowLLM()
+    return model
+
+
+async def respond_concurrently()->float:
+    """
+    Gets the responses of two models at the same time
+
+    Returns:
+        The time taken in seconds
+    """
+    start = time.perf_counter()
+    await asyncio.gather(create_model().aget_prompt_response("Question"),
+                         create_model().aget_prompt_response_without_memory("Question"))
+    return time.perf_counter() - start
+
+
+def test_responses_do_not_block_the_event_loop():
+    assert run_sync(respond_concurrently()) < 2 * DELAY
@@ -0,0 +1,46 @@
+"""
+Tests of the writes of a streamed message to its delta stream
+"""
+import json
+from unittest.mock import MagicMock, patch
+from streamlit.testing.v1 import AppTest
+from ui_elements.components import DeltaStream
+
+WRITES = 1000
+
+
+def test_full_text_is_sent_again_when_it_doubles():
+    stream = DeltaStream("stream")
+    with patch("ui_elements.components._delta_stream") as delta_stream:
+        for index in range(WRITES):
+            stream.write(MagicMock(), "token ", done=index == WRITES - 1)
+    writes = [call.kwargs for call in delta_stream.call_args_list]
+    assert [write["sequence"] for write in writes] == list(range(1, WRITES + 1))
+    assert len({write["key"] for write in writes}) == WRITES
+    full_texts = [len(write["text"]) for write in writes if write["text"] is not None]
+    assert full_texts[0] == len("token ")
+    assert all(length >= 2 * previous for previous, length in zip(full_texts, full_texts[1:-1]))
+    assert writes[-1]["text"] == stream.text and writes[-1]["done"]
+    sent = sum(len(write["delta"]) + len(write["text"] or "") for write in writes)
+    assert sent <= 4 * len(stream.text)
+
+
+def stream_message():
+    """
+    Streams a message in a placeholder in one run of the script
+    """
+    # pylint: disable=import-outside-toplevel
+    import streamlit as st
+    from ui_elements.components import DeltaStream, write_stream_delta
+    placeholder = st.empty()
+    write_stream_delta(placeholder, "stream", 0, text="I am thinking...")
+    stream = DeltaStream("stream")
+    for index in range(10):
+        stream.write(placeholder, "token ", done=index == 9)
+
+
+def test_writes_of_a_run_are_accepted():
+    app = AppTest.from_function(stream_message).run()
+    assert not app.exception
+    args = json.loads(app.get("component_instance")[0].proto.json_args)
+    assert args["text"] == "token " * 10 and args["done"]
@@ -0,0 +1,59 @@
+"""
+Tests of the pooled HTTP sessions of the ChatGPT model against a local stand-in server
+"""
+import time
+import pytest
+from tests.openai_stand_in import RESPONSE, OpenAIStandIn
+from models.chat_gpt import ChatGPT
+from models.http_client_pool import OPENAI_SESSION_POOL
+from utils.async_runner import run_sync
+
+
+@pytest.fixture(name="server")
+def fixture_server():
+    """
+    Runs the stand-in server on the process wide event loop and empties the pool afterwards
+    """
+    server = OpenAIStandIn()
+    run_sync(server.start())
+    idle_timeout = OPENAI_SESSION_POOL.idle_timeout
+    yield server
+    run_sync(OPENAI_SESSION_POOL.close())
+    OPENAI_SESSION_POOL.idle_timeout = idle_timeout
+    run_sync(server.close())
+
+
+def create_model(server:OpenAIStandIn, streaming:bool=False, **kvargs)->ChatGPT:
+    """
+    Creates a ChatGPT model which sends its requests to the stand-in server
+    """
+    return ChatGPT(openai_api_key="sk-stand-in", openai_api_base=server.base_url,
+                   streaming=streaming, **kvargs)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_connection_is_reused_across_turns(server:OpenAIStandIn, streaming:bool):
+    model = create_model(server, streaming=streaming)
+    for turn in range(3):
+        assert run_sync(model.aget_prompt_response(f"Question {turn}")).strip() == RESPONSE
+    assert len(server.client_ports) == 3
+    assert server.connection_count == 1
+
+
+def test_connection_is_reused_across_conversations(server:OpenAIStandIn):
+    for turn in range(3):
+        model = create_model(server)
+        assert run_sync(model.aget_prompt_response(f"Question {turn}")) == RESPONSE
+    assert server.connection_count == 1
+
+
+def test_session_closes_after_idle_timeout(server:OpenAIStandIn):
+    model = create_model(server, client_idle_timeout=0.2)
+    run_sync(model.aget_prompt_response("Question"))
+    sessions = [pooled.session for pooled in OPENAI_SESSION_POOL._sessions.values()]
+    assert len(sessions) == 1 and not sessions[0].closed
+    time.sleep(0.5)
+    assert sessions[0].closed
+    assert not OPENAI_SESSION_POOL._sessions
+    run_sync(model.aget_prompt_response("Question"))
+    assert server.connection_count == 2
@@ -0,0 +1,159 @@
+"""
+Tests of the process wide llama model cache with a stand-in for llama-cpp-python
+"""
+import sys
+import threading
+import types
+import pytest
+from models.base_langchain_model import BaseLangChainModel
+from models.llama_cache import (LLAMA_CONVERSATION_STATES, LLAMA_WEIGHT_CACHE, LlamaWeightCache,
+                                SharedLlamaCpp)
+from models.rolling_summary_memory import RollingSummaryMemory
+from utils.async_runner import run_sync
+
+TIMEOUT = 5
+
+
+class StandInLlama:
+    """
+    Stand-in for llama_cpp.Llama whose load waits until the test releases it
+    """
+    loads:list = []
+    release_load = threading.Event()
+
+    def __init__(self, model_path:str, **model_params) -> None:
+        StandInLlama.loads.append(model_path)
+        assert StandInLlama.release_load.wait(TIMEOUT)
+        self.model_path = model_path
+        self.model_params = model_params
+        self.context:list = []
+        self.loaded_states:list = []
+
+    def __call__(self, prompt:str, **params)->dict:
+        self.context.append(prompt)
+        return {"choices": [{"text": f"Reply {len(self.context)}"}]}
+
+    def save_state(self)->types.SimpleNamespace:
+        return types.SimpleNamespace(llama_state_size=len(self.context),
+                                     context=list(self.context))
+
+    def load_state(self, state:types.SimpleNamespace)->None:
+        self.loaded_states.append(state.context)
+        self.context = list(state.context)
+
+
+class StandInGrammar:
+    """
+    Stand-in for llama_cpp.LlamaGrammar
+    """
+
+    def __init__(self, source:str) -> None:
+        self.source = source
+
+    @classmethod
+    def from_string(cls, grammar:str)->"StandInGrammar":
+        return cls(grammar)
+
+    @classmethod
+    def from_file(cls, grammar_path:str)->"StandInGrammar":
+        return cls(str(grammar_path))
+
+
+@pytest.fixture(name="model_files")
+def fixture_model_files(tmp_path, monkeypatch):
+    """
+    Installs the stand-in llama_cpp module and creates two model files
+    """
+    llama_cpp = types.ModuleType("llama_cpp")
+    llama_cpp.Llama = StandInLlama
+    llama_cpp.LlamaGrammar = StandInGrammar
+    monkeypatch.setitem(sys.modules, "llama_cpp", llama_cpp)
+    StandInLlama.loads = []
+    StandInLlama.release_load.clear()
+    model_files = []
+    for name in ["first.gguf", "second.gguf"]:
+        model_file = tmp_path / name
+        model_file.write_bytes(b"weights")
+        model_files.append(str(model_file))
+    yield model_files
+    StandInLlama.release_load.set()
+
+
+def test_cached_model_is_acquired_while_another_model_loads(model_files):
+    cache = LlamaWeightCache()
+    StandInLlama.release_load.set()
+    first_key, _ = cache.acquire(model_files[0], {})
+    StandInLlama.release_load.clear()
+    loading = threading.Thread(target=cache.acquire, args=(model_files[1], {}))
+    loading.start()
+    try:
+        acquired = []
+        acquiring = threading.Thread(
+            target=lambda: acquired.append(cache.acquire(model_files[0], {})))
+        acquiring.start()
+        acquiring.join(TIMEOUT)
+        assert acquired and acquired[0][0] == first_key
+        cache.release(first_key)
+    finally:
+        StandInLlama.release_load.set()
+        loading.join(TIMEOUT)
+    assert StandInLlama.loads == model_files
+
+
+def test_concurrent_acquires_load_the_model_once(model_files):
+    cache = LlamaWeightCache()
+    entries = []
+    threads = [threading.Thread(target=lambda: entries.append(cache.acquire(model_files[0], {})))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    StandInLlama.release_load.set()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert StandInLlama.loads == [model_files[0]]
+    assert len({id(entry) for _, entry in entries}) == 1
+    assert entries[0][1].ref_count == 4
+
+
+def test_grammar_is_loaded(model_files):
+    StandInLlama.release_load.set()
+    llm = SharedLlamaCpp(model_path=model_files[0], grammar='root ::= "yes"')
+    assert isinstance(llm.grammar, StandInGrammar)
+    assert llm.grammar.source == 'root ::= "yes"'
+
+
+def test_grammar_and_grammar_path_are_rejected(model_files):
+    StandInLlama.release_load.set()
+    with pytest.raises(ValueError, match="Can only pass in one of grammar and grammar_path"):
+        SharedLlamaCpp(model_path=model_files[0], grammar='root ::= "yes"',
+                       grammar_path="grammar.gbnf")
+    assert not StandInLlama.loads
+
+
+def test_summary_keeps_the_context_of_the_conversation(model_files):
+    StandInLlama.release_load.set()
+    llm = SharedLlamaCpp(model_path=model_files[0], streaming=False)
+    client = LLAMA_WEIGHT_CACHE.get_entry(llm.weight_cache_key).client
+    llm("Turn")
+    memory = RollingSummaryMemory(llm=llm, k=1)
+    memory.chat_memory.add_user_message("Question")
+    memory.chat_memory.add_ai_message("Answer")
+    run_sync(memory.asummarize(2))
+    assert memory.summary == "Reply 2"
+    llm("Next turn")
+    assert client.loaded_states == [["Turn"]]
+    assert client.context == ["Turn", "Next turn"]
+    # pylint: disable=protected-access
+    assert not [key for key in LLAMA_CONVERSATION_STATES._states
+                if key[0] == llm.weight_cache_key]
+
+
+def test_title_keeps_the_context_of_the_conversation(model_files):
+    StandInLlama.release_load.set()
+    model = BaseLangChainModel(SharedLlamaCpp, model_path=model_files[0], streaming=False)
+    client = LLAMA_WEIGHT_CACHE.get_entry(model.llm.weight_cache_key).client
+    model.llm("Turn")
+    assert run_sync(model.aget_prompt_response_without_memory("Title")) == "Reply 2"
+    model.llm("Next turn")
+    assert client.loaded_states == [["Turn"]]
+    assert client.context == ["Turn", "Next turn"]
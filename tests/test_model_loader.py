@@ -0,0 +1,62 @@
+"""
+Tests of the import of the model classes from the model files
+"""
+import os
+import sys
+import pytest
+import models.chat_gpt
+from models.model_loader import get_module_name, load_model_class
+
+APP_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILE = """
+from models.base_model import BaseLLMModel
+
+
+class {class_name}(BaseLLMModel):
+    pass
+"""
+
+
+def test_loading_keeps_the_imported_module():
+    model_class = load_model_class(os.path.join(APP_HOME, "models", "chat_gpt.py"), "ChatGPT")
+    assert sys.modules["models.chat_gpt"] is models.chat_gpt
+    assert model_class.__module__ != "models.chat_gpt"
+    assert model_class is load_model_class(os.path.join(APP_HOME, "models", "chat_gpt.py"),
+                                           "ChatGPT")
+
+
+def test_failed_load_keeps_the_modules(tmp_path):
+    llm_model_file = tmp_path / "chat_gpt.py"
+    llm_model_file.write_text("raise RuntimeError('broken model file')\n")
+    modules = dict(sys.modules)
+    with pytest.raises(RuntimeError, match="broken model file"):
+        load_model_class(str(llm_model_file), "ChatGPT")
+    assert sys.modules["models.chat_gpt"] is models.chat_gpt
+    assert get_module_name(str(llm_model_file), os.stat(llm_model_file).st_mtime_ns) \
+        not in sys.modules
+    assert set(sys.modules) == set(modules)
+
+
+def test_files_with_the_same_name_are_separate_modules(tmp_path):
+    model_classes = []
+    for directory, class_name in [("first", "FirstModel"), ("second", "SecondModel")]:
+        os.makedirs(tmp_path / directory)
+        llm_model_file = tmp_path / directory / "custom.py"
+        llm_model_file.write_text(MODEL_FILE.format(class_name=class_name))
+        model_classes.append(load_model_class(str(llm_model_file), class_name))
+    assert model_classes[0].__module__ != model_classes[1].__module__
+    assert all(sys.modules[model_class.__module__] for model_class in model_classes)
+
+
+def test_changed_file_is_loaded_as_a_new_module(tmp_path):
+    llm_model_file = tmp_path / "custom.py"
+    llm_model_file.write_text(MODEL_FILE.format(class_name="CustomModel"))
+    old_class = load_model_class(str(llm_model_file), "CustomModel")
+    llm_model_file.write_text(MODEL_FILE.format(class_name="CustomModel") + "VERSION = 2\n")
+    mtime_ns = os.stat(llm_model_file).st_mtime_ns + 1_000_000_000
+    os.utime(llm_model_file, ns=(mtime_ns, mtime_ns))
+    new_class = load_model_class(str(llm_model_file), "CustomModel")
+    assert new_class is not old_class
+    assert sys.modules[new_class.__module__].VERSION == 2
+    assert sys.modules[old_class.__module__] is not sys.modules[new_class.__module__]
+    assert not hasattr(sys.modules[old_class.__module__], "VERSION")
@@ -0,0 +1,21 @@
+"""
+Tests of the responses generated in the background
+"""
+from backend.backend import start_response
+from conversations.conversation import Conversation
+from models.base_langchain_model import BaseLangChainModel
+from schema.message import Message
+
+TIMEOUT = 5
+
+
+def test_stored_user_message_keeps_the_pending_message_id():
+    conversation = Conversation(conversation_topic="Test", key="test",
+                                llm_model=BaseLangChainModel(responses=["Answer"]))
+    pending_response = start_response(conversation, "Question")
+    assert pending_response.future.result(TIMEOUT) == "Answer"
+    user_message, ai_message = conversation.llm_model.get_messages()
+    assert user_message.message_id == pending_response.user_message.message_id
+    assert user_message.timestamp == pending_response.user_message.timestamp
+    message_id_type = type(Message(message="Answer", message_type="AI").message_id)
+    assert isinstance(ai_message.message_id, message_id_type)
@@ -0,0 +1,63 @@
+"""
+Tests of the list of conversations in the sidebar of the chat page
+"""
+from unittest.mock import MagicMock
+from streamlit.testing.v1 import AppTest
+from conversations.conversation import Conversation
+from conversations.conversation_registry import ConversationRegistry
+from models.base_langchain_model import BaseLangChainModel
+
+
+def render_sidebar_region():
+    """
+    Renders the list of conversations and stores the number of fragments of the run
+    """
+    # pylint: disable=import-outside-toplevel
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    from app_utils import get_current_conversation, load_conversation_registry, render_sidebar
+    with st.sidebar:
+        render_sidebar(get_current_conversation(), load_conversation_registry())
+    st.session_state["fragment_count"] = len(get_script_run_ctx().new_fragment_ids)
+
+
+def create_app(pending_response)->AppTest:
+    """
+    Creates the app with two conversations, the last one is the current one
+
+    Args:
+        pending_response: The pending response of the current conversation, if any
+
+    Returns:
+        The app which was run once
+    """
+    conversation_registry = ConversationRegistry()
+    for topic in ["First", "Second"]:
+        llm_model = BaseLangChainModel(responses=["Answer"])
+        conversation_registry.add(Conversation(conversation_topic=topic, key="test",
+                                               llm_model=llm_model, is_summarized=True))
+    app = AppTest.from_function(render_sidebar_region)
+    app.session_state["conversation_registry"] = conversation_registry
+    app.session_state["current_conversation"] = list(conversation_registry)[-1]
+    app.session_state["pending_response"] = pending_response
+    return app.run()
+
+
+def test_list_is_a_fragment_without_a_pending_response():
+    app = create_app(None)
+    assert not app.exception
+    assert app.session_state["fragment_count"] == 1
+
+
+def test_switch_during_a_pending_response_cancels_it():
+    pending_response = MagicMock()
+    app = create_app(pending_response)
+    assert not app.exception
+    # The click reruns the page, which stops the stream of the response
+    assert app.session_state["fragment_count"] == 0
+    first_conversation = list(app.session_state["conversation_registry"])[0]
+    app.button(key=f"conversation_{first_conversation.conversation_id}").click().run()
+    pending_response.cancel.assert_called_once()
+    assert app.session_state["pending_response"] is None
+    assert app.session_state["current_conversation"] is first_conversation
+    assert app.session_state["fragment_count"] == 1
@@ -0,0 +1,63 @@
+"""
+Tests of the threads from which StreamlitDisplayHandler displays the tokens
+"""
+from unittest.mock import MagicMock
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.testing.v1 import AppTest
+from models.base_langchain_model import StreamlitDisplayHandler
+from utils.async_runner import run_sync
+
+TOKENS = ["Hello", " from", " the", " loop"]
+
+
+async def generate(handler:StreamlitDisplayHandler)->str:
+    """
+    Sends the tokens to the handler from the event loop as a streaming LLM does
+
+    Returns:
+        The response
+    """
+    handler.on_llm_start({}, ["prompt"])
+    for token in TOKENS:
+        handler.on_llm_new_token(token)
+    handler.on_llm_end("".join(TOKENS))
+    return "".join(TOKENS)
+
+
+def get_loop_thread_context():
+    """
+    Gets the script run context of the event loop thread
+    """
+    async def get_context():
+        return get_script_run_ctx(suppress_warning=True)
+    return run_sync(get_context())
+
+
+def test_tokens_are_not_displayed_from_the_event_loop():
+    container = MagicMock()
+    handler = StreamlitDisplayHandler(container, render_mode="full", flush_tokens=1)
+    assert run_sync(generate(handler)) == "".join(TOKENS)
+    container.markdown.assert_not_called()
+    assert handler.pending_tokens == TOKENS
+    assert get_loop_thread_context() is None
+
+
+def stream_from_the_loop():
+    """
+    Streams a response generated on the event loop in the script thread
+    """
+    # pylint: disable=import-outside-toplevel,reimported,redefined-outer-name
+    import streamlit as st
+    from models.base_langchain_model import StreamlitDisplayHandler
+    from tests.test_stream_handler import generate
+    from utils.async_runner import submit
+    handler = StreamlitDisplayHandler(None, render_mode="full", flush_tokens=1)
+    st.session_state["response"] = handler.stream(st.empty(), submit(generate(handler)))
+
+
+def test_tokens_are_displayed_by_the_script():
+    app = AppTest.from_function(stream_from_the_loop).run()
+    assert not app.exception
+    assert app.session_state["response"] == "".join(TOKENS)
+    assert [markdown.value for markdown in app.markdown] == ["".join(TOKENS)]
+    assert get_loop_thread_context() is None
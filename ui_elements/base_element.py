@@ -842,24 +842,31 @@ class StreamLitPydanticModel(BaseModel):
         """
         This function renders the sidebar
         """
+        with st.sidebar:
+            self.render_required_fields()
+
+
+    def render_required_fields(self)->None:
+        """
+        This function renders the required fields in the current container
+        """
         fields_to_show = self.additional_custom_fields_to_edit()
         if not fields_to_show:
             return
-        with st.sidebar:
-            st.title("Required Fields")
-            for field in fields_to_show:
+        st.title("Required Fields")
+        for field in fields_to_show:
 
-                if isinstance(field, FormatOption):
-                    field_name = field.field_name
-                    field_type = field.format_type
-                else:
-                    field_name = field
-                    field_type = None
-                field_value = self.get_additional_custom_field_value(field_name)
-                if field_value is None:
-                    field_value = self.get_default_value(field_type=field_type)
-                self.render_object(field_name, field_name, field_value, field_type=field_type,
-                                    edit_mode=True)
+            if isinstance(field, FormatOption):
+                field_name = field.field_name
+                field_type = field.format_type
+            else:
+                field_name = field
+                field_type = None
+            field_value = self.get_additional_custom_field_value(field_name)
+            if field_value is None:
+                field_value = self.get_default_value(field_type=field_type)
+            self.render_object(field_name, field_name, field_value, field_type=field_type,
+                                edit_mode=True)
 
 
     def set_value_from_sidebar(self):
@@ -2,32 +2,142 @@
 This file contains the functions to render the user and system messages
 """
 import os
+from typing import Optional
 import streamlit as st
+import streamlit.components.v1 as components
 from schema.message import Message
 from schema.group_message import GroupMessage
 from schema.attachment_message import AttachmentMessage
+from ui_elements.render_cache import RenderedMessage, get_render_cache
+
+
+_delta_stream = components.declare_component(
+    "delta_stream", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "delta_stream"))
+
+
+def write_stream_delta(placeholder, key:str, sequence:int, delta:str="",
+                       text:Optional[str]=None, done:bool=False)->None:
+    """
+    This function writes a part of a streamed message to the placeholder
+    Only the delta is sent to the browser which appends it to the text already shown,
+    so the data sent for a message grows linearly with its length.
+    Every write is a new element with its own key, the browser keeps the text of the
+    stream between the elements. The stream shows the text as plain text, the finished
+    message is rendered as markdown in place of the stream.
+
+    Args:
+        placeholder: The placeholder in which the message is streamed
+        key: The key of the streamed message, it must be the same for all the writes
+        sequence: The sequence number of the write, it increases with every write
+                  and starts again when the full text is sent
+        delta: The text to append
+        text: The full text which replaces the text shown, the delta is ignored if passed
+        done: Whether the stream is complete, the cursor is hidden if True
+    """
+    with placeholder:
+        _delta_stream(stream=key, sequence=sequence, delta=delta, text=text, done=done,
+                      key=f"{key}_{sequence}", default=None)
+
+
+class DeltaStream:
+    """
+    This class is used to write the flushes of a streamed message to its delta stream
+    The browser skips the elements replaced before they are shown, for example when
+    several flushes arrive at once on a slow link, and then misses their deltas.
+    The full text is sent again whenever it has doubled since it was last sent
+    and with the last flush, the text shown then catches up and the data sent
+    stays linear in the length of the message.
+    """
+
+    def __init__(self, key:str) -> None:
+        """
+        This is the constructor for the DeltaStream class
+
+        Args:
+            key: The key of the streamed message
+        """
+        self.key = key
+        self.sequence = 0
+        self.text = ""
+        self.sent_length = 0
+
+
+    def write(self, placeholder, delta:str, done:bool=False)->None:
+        """
+        This method is used to write a flush to the delta stream
+        The first write replaces the text shown in the placeholder
+
+        Args:
+            placeholder: The placeholder in which the message is streamed
+            delta: The text to append
+            done: Whether the stream is complete, the cursor is hidden if True
+        """
+        self.sequence += 1
+        self.text += delta
+        if done or self.sequence == 1 or len(self.text) >= 2 * self.sent_length:
+            self.sent_length = len(self.text)
+            write_stream_delta(placeholder, self.key, self.sequence, text=self.text, done=done)
+        else:
+            write_stream_delta(placeholder, self.key, self.sequence, delta=delta)
+
+
+def render_message_time(message:Message)->RenderedMessage:
+    """
+    This function renders the time of a message and the metrics of its response
+
+    Args:
+        message: The message
+
+    Returns:
+        The rendered time and metrics of the message
+    """
+    metrics = getattr(message, "metrics", None)
+    return RenderedMessage(message.timestamp.strftime("%I:%M %p"),
+                           metrics.summary() if metrics is not None else None)
+
+
+def render_response_time(message:Message, previous_user_message:Message)->RenderedMessage:
+    """
+    This function renders the time taken for the system to respond and the metrics of the response
+
+    Args:
+        message: The message object containing system message
+        previous_user_message: The previous user message
+
+    Returns:
+        The rendered response time and metrics of the message
+    """
+    time_taken_for_response = message.timestamp - previous_user_message.timestamp
+    time_in_ms = time_taken_for_response.total_seconds()
+    return RenderedMessage(f"🕓 {time_in_ms:0.2f}s " + message.timestamp.strftime("%I:%M %p"),
+                           message.metrics.summary() if message.metrics is not None else None)
 
 
 def render_user_message(message:Message)->None:
     """
     This function renders the user message
+    The rendered time of the message is cached by message id
     
     Args:
         message: The message object containing user message
     """
+    rendered = get_render_cache().get(message.message_id, lambda: render_message_time(message))
     columns_weights = [0.5, 0.5]
     _, user_col = st.columns(columns_weights)
     with user_col:
         with st.chat_message("user"):
             st.write(message.message)
-        st.write(message.timestamp.strftime("%I:%M %p"))
+        st.write(rendered.time_text)
 
 
 def render_system_message(message:Message, previous_user_message:Message,
                           message_placeholder=None, container=None,
-                          calculate_time=True, icon_path=None)->tuple[st.container, st.empty]:
+                          calculate_time=True, icon_path=None,
+                          stream_key:Optional[str]=None)->tuple[st.container, st.empty]:
     """
     This function renders the system message
+    The rendered time of the message is cached by message id if it is not rendered
+    in an existing container, which is the case of the history
     
     Args:
         message: The message object containing system message
@@ -36,10 +146,13 @@ def render_system_message(message:Message, previous_user_message:Message,
         container: The container of the system message.
         calculate_time: Whether to calculate the time taken for the system to respond
         icon_path: The path to Model chat Icon
+        stream_key: If passed the message is shown in a delta stream with this key,
+                    to which the streamed tokens are written with DeltaStream
     
     Returns:
         The container and the message placeholder of the system message
     """
+    container_is_new = container is None
     columns_weights = [0.9, 0.1]
     system_col, _ = st.columns(columns_weights)
     with system_col:
@@ -48,18 +161,24 @@ def render_system_message(message:Message, previous_user_message:Message,
         else:
             container.empty()
         with container:
-            if message_placeholder:
-                message_placeholder.write(message.message)
-            else:
+            if message_placeholder is None:
                 message_placeholder = st.empty()
+            if stream_key:
+                write_stream_delta(message_placeholder, stream_key, 0, text=message.message)
+            else:
                 message_placeholder.write(message.message)
     if calculate_time:
         # columns to store the time taken for the system to respond
+        if container_is_new:
+            rendered = get_render_cache().get(
+                message.message_id, lambda: render_response_time(message, previous_user_message))
+        else:
+            rendered = render_response_time(message, previous_user_message)
         system_time_col, _ = st.columns([0.3, 0.7])
-        time_taken_for_response = message.timestamp - previous_user_message.timestamp
-        time_in_ms = time_taken_for_response.total_seconds()
         with system_time_col:
-            st.write(f"🕓 {time_in_ms:0.2f}s " + message.timestamp.strftime("%I:%M %p"))
+            st.write(rendered.time_text)
+        if rendered.caption is not None:
+            st.caption(rendered.caption)
     return container, message_placeholder
 
 
@@ -70,6 +189,7 @@ def render_group_user_message(message:GroupMessage)->None:
     Args:
         message: The message object containing user message
     """
+    rendered = get_render_cache().get(message.message_id, lambda: render_message_time(message))
     column_weights = [0.5, 0.5]
     _, user_col = st.columns(column_weights)
     with user_col:
@@ -78,12 +198,14 @@ def render_group_user_message(message:GroupMessage)->None:
             st.write(message.message)
             system_time_col, _ = st.columns([0.3, 0.7])
             with system_time_col:
-                st.write(message.timestamp.strftime("%I:%M %p"))
+                st.write(rendered.time_text)
 
 
     
 def render_group_ai_message(message:GroupMessage, container=None,
-                            placeholder=None, show_time=False)->None:
+                            placeholder=None, show_time=False,
+                            stream_key:Optional[str]=None)->tuple[st.container, st.empty,
+                                                                  Optional[st.empty]]:
     """
     This function renders the group system message
 
@@ -91,8 +213,17 @@ def render_group_ai_message(message:GroupMessage, container=None,
         message: The message object containing system message
         container: The container of the system message.
         placeholder: The placeholder to write the message
-        show_time: Whether to show the time
+        show_time: Whether to show the time, the rendered time is cached by message id
+                   if the message is not rendered in an existing container
+        stream_key: If passed the message is shown in a delta stream with this key,
+                    to which the streamed tokens are written with DeltaStream
+
+    Returns:
+        The container and the placeholder of the message, and the placeholder
+        of the delta stream if the message is streamed
     """
+    container_is_new = container is None
+    stream_placeholder = None
     column_weights = [0.9, 0.1]
     system_col, _ = st.columns(column_weights)
     with system_col:
@@ -112,10 +243,20 @@ def render_group_ai_message(message:GroupMessage, container=None,
                     with open(message.message, 'rb') as fh:
                         st.download_button(f"Download {message.attachment_type}",
                                             fh, file_name)
+            elif stream_key:
+                stream_placeholder = st.empty()
+                write_stream_delta(stream_placeholder, stream_key, 0, text=message.message)
             else:
                 st.write(message.message)
             if show_time:
+                if container_is_new:
+                    rendered = get_render_cache().get(message.message_id,
+                                                      lambda: render_message_time(message))
+                else:
+                    rendered = render_message_time(message)
                 system_time_col, _ = st.columns([0.2, 0.8])
                 with system_time_col:
-                    st.write(message.timestamp.strftime("%I:%M %p"))
-    return container, placeholder
+                    st.write(rendered.time_text)
+                if rendered.caption is not None:
+                    st.caption(rendered.caption)
+    return container, placeholder, stream_placeholder
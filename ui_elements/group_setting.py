@@ -19,6 +19,10 @@ class MetaGPTSetting(StreamLitPydanticModel):
     code_review: bool = Field(description="Enable Code Review", default=True)
     openai_api_key: str = Field(description="The OpenAI API key", default="")
     run_tests: bool = Field(description="Generate Test Cases for the application", default=False)
+    flush_interval_ms: float = Field(description=("The milliseconds after which the streamed"
+                                                  " tokens are displayed"), default=200)
+    flush_tokens: int = Field(description=("The number of streamed tokens after which"
+                                           " they are displayed"), default=64)
 
     def set_field_value(self, field_name: str, field_value: Any) -> None:
         """
@@ -0,0 +1,74 @@
+"""
+This module implements the cache of the rendered text of the finished messages of a session
+"""
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+class RenderedMessage(NamedTuple):
+    """
+    This class is used to store the text which is rendered for a message
+    besides the message itself
+    """
+    time_text: str
+    caption: Optional[str] = None
+
+
+class RenderCache:
+    """
+    This class is used to memoize the rendered text of the messages by message id
+    The least recently rendered messages are evicted when the cache is full
+    """
+
+    def __init__(self, max_size:int=512) -> None:
+        """
+        This is the constructor for the RenderCache class
+
+        Args:
+            max_size: The maximum number of messages in the cache
+        """
+        self.max_size = max_size
+        self._rendered:OrderedDict[Hashable, RenderedMessage] = OrderedDict()
+
+
+    def get(self, message_id:Hashable,
+            render:Callable[[], RenderedMessage])->RenderedMessage:
+        """
+        This method is used to get the rendered text of a message, it is rendered on a miss
+
+        Args:
+            message_id: The id of the message
+            render: The function which renders the text of the message
+
+        Returns:
+            The rendered text of the message
+        """
+        rendered = self._rendered.get(message_id)
+        if rendered is None:
+            rendered = render()
+            self._rendered[message_id] = rendered
+            if len(self._rendered) > self.max_size:
+                self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(message_id)
+        return rendered
+
+
+# The cache used when there is no session, for example when rendering without a streamlit server
+_BARE_RENDER_CACHE = RenderCache()
+
+
+def get_render_cache()->RenderCache:
+    """
+    Gets the render cache of the session
+
+    Returns:
+        The render cache
+    """
+    if get_script_run_ctx() is None:
+        return _BARE_RENDER_CACHE
+    if 'render_cache' not in st.session_state:
+        st.session_state['render_cache'] = RenderCache()
+    return st.session_state['render_cache']
@@ -0,0 +1,68 @@
+"""
+The async runner module runs coroutines on a single process wide event loop
+"""
+import asyncio
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+_EVENT_LOOP:Optional[asyncio.AbstractEventLoop] = None
+_EVENT_LOOP_LOCK = Lock()
+
+
+def get_event_loop()->asyncio.AbstractEventLoop:
+    """
+    Gets the process wide event loop, the loop is started on a daemon thread on first use
+
+    Returns:
+        The event loop
+    """
+    global _EVENT_LOOP # pylint: disable=global-statement
+    if _EVENT_LOOP is not None:
+        return _EVENT_LOOP
+    with _EVENT_LOOP_LOCK:
+        if _EVENT_LOOP is None:
+            loop = asyncio.new_event_loop()
+            thread = Thread(target=loop.run_forever, name="ai-chatverse-event-loop", daemon=True)
+            thread.start()
+            _EVENT_LOOP = loop
+    return _EVENT_LOOP
+
+
+def submit(coroutine:Coroutine[Any, Any, T])->Future:
+    """
+    Schedules the coroutine on the process wide event loop
+
+    Args:
+        coroutine: The coroutine to run
+
+    Returns:
+        The future with the result of the coroutine
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop())
+
+
+def run_sync(coroutine:Coroutine[Any, Any, T])->T:
+    """
+    Runs the coroutine on the process wide event loop and waits for the result
+
+    Args:
+        coroutine: The coroutine to run
+
+    Returns:
+        The result of the coroutine
+
+    Raises:
+        RuntimeError: If called from the process wide event loop itself
+    """
+    loop = get_event_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        coroutine.close()
+        raise RuntimeError("run_sync can not be called from the event loop, await instead")
+    return submit(coroutine).result()
@@ -0,0 +1,145 @@
+"""
+The cancellation module is used to stop the generations which nobody will read
+"""
+from threading import Event, Lock
+from typing import Any, Dict, List
+from langchain.callbacks.base import BaseCallbackHandler
+
+
+class GenerationCancelled(Exception):
+    """
+    This exception is raised in the LLM callbacks to stop a cancelled generation
+    """
+
+
+class CancellationToken:
+    """
+    This class is used to request the cancellation of a generation from another thread
+    """
+
+    def __init__(self) -> None:
+        """
+        This is the constructor for the CancellationToken class
+        """
+        self._event = Event()
+
+
+    def cancel(self)->None:
+        """
+        This method is used to request the cancellation
+        """
+        self._event.set()
+
+
+    @property
+    def is_cancelled(self)->bool:
+        """
+        This method is used to check whether the cancellation was requested
+
+        Returns:
+            True if the cancellation was requested
+        """
+        return self._event.is_set()
+
+
+    def raise_if_cancelled(self)->None:
+        """
+        This method is used to stop the caller if the cancellation was requested
+
+        Raises:
+            GenerationCancelled: If the cancellation was requested
+        """
+        if self._event.is_set():
+            raise GenerationCancelled()
+
+
+#pylint: disable=abstract-method
+class CancellationHandler(BaseCallbackHandler):
+    """
+    This class is used to stop the LLM at the next token once the token is cancelled
+    The exception raised in the callback is propagated to the LLM which stops generating.
+    The generated tokens are kept so the partial response can be saved.
+    """
+    raise_error = True
+    run_inline = True
+
+    def __init__(self, cancellation_token:CancellationToken) -> None:
+        """
+        This is the constructor for the CancellationHandler class
+
+        Args:
+            cancellation_token: The token which cancels the generation
+        """
+        self.cancellation_token = cancellation_token
+        self.tokens:List[str] = []
+
+
+    def on_llm_start(self, serialized:Dict[str, Any], prompts:List[str], **kwargs) -> None:
+        """
+        This method is used to stop the generation before it starts if it is cancelled
+
+        Args:
+            serialized: The serialized LLM
+            prompts: The prompts given to the LLM
+            **kwargs: The keyword arguments
+        """
+        self.cancellation_token.raise_if_cancelled()
+
+
+    def on_llm_new_token(self, token:str, **kwargs) -> None:
+        """
+        This method is used to stop the generation if it is cancelled
+
+        Args:
+            token: The newly generated token
+            **kwargs: The keyword arguments
+        """
+        self.cancellation_token.raise_if_cancelled()
+        self.tokens.append(token)
+
+
+class CancellationStats:
+    """
+    This class is used to count the tokens which were not generated thanks to cancellations
+    The tokens saved by a cancellation are estimated with the average number of tokens
+    of the completed responses
+    """
+
+    def __init__(self) -> None:
+        """
+        This is the constructor for the CancellationStats class
+        """
+        self.completed_responses = 0
+        self.completed_tokens = 0
+        self.cancelled_responses = 0
+        self.tokens_saved = 0
+        self._lock = Lock()
+
+
+    def record_completed(self, token_count:int)->None:
+        """
+        This method is used to record a response which was completed
+
+        Args:
+            token_count: The number of tokens of the response
+        """
+        with self._lock:
+            self.completed_responses += 1
+            self.completed_tokens += token_count
+
+
+    def record_cancelled(self, token_count:int)->None:
+        """
+        This method is used to record a response which was cancelled
+
+        Args:
+            token_count: The number of tokens generated before the cancellation
+        """
+        with self._lock:
+            self.cancelled_responses += 1
+            if self.completed_responses:
+                average_tokens = round(self.completed_tokens / self.completed_responses)
+                self.tokens_saved += max(0, average_tokens - token_count)
+
+
+CANCELLATION_STATS = CancellationStats()
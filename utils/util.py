@@ -44,3 +44,66 @@ def get_field_name(data:dict[str, Any], field_names:list[str])->Optional[str]:
             return field_name
     return None
 
+
+
+def split_markdown_blocks(text:str)->tuple[list[str], str]:
+    """
+    Splits the completed blocks from the start of a markdown text which is being streamed
+    A block is completed by a blank line followed by a line which is not indented,
+    or by the closing line of a code fence.
+
+    Args:
+        text: The markdown text, it must start at a block boundary
+    Returns:
+        The completed blocks and the text of the block which is still open
+    """
+    blocks = []
+    block_start = 0
+    offset = 0
+    fence = None
+    previous_blank = False
+    lines = text.split("\n")
+    for line in lines[:-1]:
+        line_end = offset + len(line) + 1
+        stripped = line.strip()
+        if fence is not None:
+            if stripped.startswith(fence) and set(stripped) == {fence[0]}:
+                blocks.append(text[block_start:line_end].strip("\n"))
+                block_start = line_end
+                fence = None
+        elif stripped.startswith("```") or stripped.startswith("~~~"):
+            if text[block_start:offset].strip():
+                blocks.append(text[block_start:offset].strip("\n"))
+            block_start = offset
+            fence = stripped[:len(stripped) - len(stripped.lstrip(stripped[0]))]
+        elif stripped and previous_blank and not line[0].isspace() \
+             and text[block_start:offset].strip():
+            blocks.append(text[block_start:offset].strip("\n"))
+            block_start = offset
+        previous_blank = fence is None and not stripped
+        offset = line_end
+    # The first character of the last line is enough to know whether it starts a block
+    last_line = lines[-1]
+    if fence is None and previous_blank and last_line and not last_line[0].isspace() \
+       and text[block_start:offset].strip():
+        blocks.append(text[block_start:offset].strip("\n"))
+        block_start = offset
+    return blocks, text[block_start:]
+
+
+def get_heuristic_title(text:str, max_words:int=5)->str:
+    """
+    Gets a short title from the first line of a text without calling an LLM
+
+    Args:
+        text: The text, usually the first message of a conversation
+        max_words: The maximum number of words of the title
+    Returns:
+        The first words of the first line which has words
+    """
+    for line in text.splitlines():
+        words = line.strip(" \t#>*_`-").split()
+        if words:
+            title = " ".join(words[:max_words])
+            return title + "…" if len(words) > max_words else title
+    return "New conversation"